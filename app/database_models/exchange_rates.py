@@ -1,6 +1,6 @@
 from enum import Enum
 from datetime import datetime
-from sqlalchemy import String, Float, Date
+from sqlalchemy import String, Float, Date, Index
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
 
@@ -10,6 +10,9 @@ class Base(DeclarativeBase):
 class ExchangeRates(Base):
 
     __tablename__ = 'exchange_rates'
+    __table_args__ = (
+        Index('ix_currency_date', 'currency_code', 'date'),
+    )
 
     date: Mapped[datetime] = mapped_column(Date, primary_key=True)
     currency_code: Mapped[str] = mapped_column(String(10), primary_key=True)
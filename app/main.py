@@ -9,9 +9,10 @@ from datetime import datetime, date, timedelta
 
 from services.logging_service import get_logger, configure_logger_globally
 from services.data_collection_service import gather_data_for_date_range
-from services.report_generator_service import generate_report
+from services.report_generator_service import REPORT_TYPES, generate_report
 
-SUPPORTED_FORMATS = ['csv', 'json']
+SUPPORTED_FORMATS = ('csv', 'json')
+TODAY = datetime.now().date()
 
 def convert_date_type(arg: str) -> datetime.date:
     """
@@ -42,12 +43,12 @@ def validate_and_convert_date_args():
         raise SystemExit('ArgumentTypeError: Incorrect date range')
 
     if args.start_date < (first_available_date := date(2002, 1, 2)):
-        logger.warning(f'Report can only be generated for archive data starting from 2002-01-02. '
-                       f'Converting start date into {str(first_available_date)}')
+        logger.warning('Report can only be generated for archive data starting from 2002-01-02. '
+                       'Converting start date into %s', first_available_date)
         args.start_date = first_available_date
-    if args.end_date > (today := datetime.now().date()):
-        logger.warning(f"Only archive data is available. Converting end date into {str(today)}")
-        args.end_date = today
+    if args.end_date > TODAY:
+        logger.warning('Only archive data is available. Converting end date into %s', TODAY)
+        args.end_date = TODAY
 
 def validate_and_convert_path_args():
     """
@@ -69,7 +70,7 @@ def validate_and_convert_path_args():
             args.filename = filename_stem + '.' + args.format
         elif filename_suffix not in SUPPORTED_FORMATS:
             args.filename = filename_stem + '.csv'
-            logger.warning(f'Provided not supported format. Replaced with .csv')
+            logger.warning('Provided not supported format. Replaced with .csv')
     else:
         if args.format:
             args.filename = args.filename + '.' + args.format
@@ -77,22 +78,27 @@ def validate_and_convert_path_args():
             args.filename = args.filename + '.csv'
 
     args.full_path = os.path.join(args.dir_path, args.filename)
-    logger.debug(f'Report target path set to {args.full_path}')
+    logger.debug('Report target path set to %s', args.full_path)
     check_if_target_report_filepath_already_exists(args.full_path)
 
 def check_if_target_report_filepath_already_exists(path):
     """
     Ask user whether to override an existing report.
+    The question is repeated until a valid answer is given.
 
     :param path: (str) Full path to target report file
     :return:
     """
 
-    while os.path.exists(path):
+    if not os.path.exists(path):
+        return
+
+    while True:
         ans = input(f"Given file's path {path} already exists. Do you want to override it? [y/n]")
         match ans.lower():
             case 'y' | 'yes':
                 os.remove(path)
+                return
             case 'n' | 'no':
                 raise SystemExit('Report generation skipped')
 
@@ -111,7 +117,7 @@ if __name__ == '__main__':
         '-r', '--report-type',
         default='h',
         metavar='TYPE',
-        choices=['h', 'historical', 'a', 'analytical'],
+        choices=tuple(REPORT_TYPES),
         help='Options: "h" or "historical" - generate a report with historical data; \n'
              'Options: "a" or "analytical" - generate a report with currencies that had the greatest rise and fall '
              'in the exchange rate during the given time period, Default: h' )
@@ -121,11 +127,11 @@ if __name__ == '__main__':
         help='generates report for specified currencies, specify single value or comma separated values (ISO 4217)')
     parser.add_argument(
         '-s', '--start-date',
-        default=str(datetime.now().date()),
+        default=str(TODAY),
         help='define the start date included in report YYYY-MM-DD (ISO 8601), Default: today')
     parser.add_argument(
         '-e', '--end-date',
-        default=str(datetime.now().date()),
+        default=str(TODAY),
         help='define the end date included in report YYYY-MM-DD (ISO 8601), Default: today')
     parser.add_argument(
         '-p', '--dir-path',
@@ -2,21 +2,42 @@
 Module for NBP API interaction.
 """
 
+import json
 import requests
 
-from math import ceil
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from itertools import chain
-from datetime import timedelta
+from datetime import date, timedelta
 from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from requests.exceptions import Timeout, ConnectionError, HTTPError, RequestException
+from urllib3.util.retry import Retry
 
 from services.logging_service import get_logger
 
 logger = get_logger(__name__)
 
+MAX_CONCURRENT_REQUESTS = 8
+REQUEST_TIMEOUT = (5, 30)
+
+_SESSION = requests.Session()
+_SESSION.headers.update({'Accept': 'application/json', 'Connection': 'keep-alive'})
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=MAX_CONCURRENT_REQUESTS,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+))
+_SESSION.mount('http://', _SESSION.get_adapter('https://'))
+
 def request_data_from_nbp_database(dates_ranges: list, currency_codes: tuple = None, table: str = 'A') -> Iterator:
     """
     Send HTTPS requests to NPB API in order to collect exchange rates data.
+    Requests are sent concurrently, up to MAX_CONCURRENT_REQUESTS at a time.
 
     :param dates_ranges: List of intervals (tuples) with date ranges\
     :param currency_codes: (str) Currency code
@@ -26,57 +47,54 @@ def request_data_from_nbp_database(dates_ranges: list, currency_codes: tuple = N
     :return: (itertools.chain) Iterator over received responses
     """
 
-    def split_into_chunks_and_send_requests(uri: str) -> Iterator:
-        """
-        Function helper; split too large ranges into chunks with length of max 93 days. (NBP API limitation)
-
-        :param uri: (str) Part of an uri without dates defined
-        :return: (itertools.chain) Iterator over received responses
-        """
-
-        _response = []
-        for start_date, end_date in dates_ranges:
-            if (end_date - start_date) <= timedelta(days=max_len):
-                _response = chain(
-                    _response,
-                    _send_request_to_nbp_api(f'{uri}/{start_date}/{end_date}/')
-                )
-            else:
-                date_chunks_num = ceil((end_date - start_date) / timedelta(days=max_len))
-                for i in range(date_chunks_num):
-                    chunk_start_date = start_date + timedelta(days=max_len * i)
-                    chunk_end_date = start_date + timedelta(days=max_len * (i + 1) - 1)
-                    chunk_end_date = chunk_end_date if chunk_end_date < end_date else end_date
-                    _response = chain(
-                        _response,
-                        _send_request_to_nbp_api(f'{uri}/{chunk_start_date}/{chunk_end_date}/')
-                    )
-        return _response
-
-    max_len, response = 93, []
+    date_chunks = [
+        date_chunk
+        for start_date, end_date in dates_ranges
+        for date_chunk in _iter_date_chunks(start_date, end_date)
+    ]
     if currency_codes:
         rates_uri = f'https://api.nbp.pl/api/exchangerates/rates/{table}'
-        for currency_code in currency_codes:
-            single_currency_uri = rates_uri + f'/{currency_code}'
-            response = chain(response, split_into_chunks_and_send_requests(single_currency_uri))
+        uris = [f'{rates_uri}/{currency_code}/{chunk_start_date}/{chunk_end_date}/'
+                for currency_code in currency_codes
+                for chunk_start_date, chunk_end_date in date_chunks]
     else:
         tables_uri = f'https://api.nbp.pl/api/exchangerates/tables/{table}'
-        response = chain(response, split_into_chunks_and_send_requests(tables_uri))
-    return response
+        uris = [f'{tables_uri}/{chunk_start_date}/{chunk_end_date}/'
+                for chunk_start_date, chunk_end_date in date_chunks]
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        responses = list(executor.map(_send_request_to_nbp_api, uris))
+    return chain.from_iterable(responses)
+
+
+def _iter_date_chunks(start_date: date, end_date: date, max_len: int = 93) -> Iterator:
+    """
+    Split date range into consecutive chunks with length of max 93 days. (NBP API limitation)
+
+    :param start_date: (datetime.date) Start date of the range
+    :param end_date: (datetime.date) End date of the range
+    :param max_len: (int) Maximal number of days in a single chunk
+    :return: Iterator[tuple] (chunk_start_date, chunk_end_date)
+    """
+
+    for offset in range(0, (end_date - start_date).days + 1, max_len):
+        chunk_start_date = start_date + timedelta(days=offset)
+        yield chunk_start_date, min(chunk_start_date + timedelta(days=max_len - 1), end_date)
 
 
 def _send_request_to_nbp_api(uri: str) -> list:
     """
     Send single HTTPS request to NBP API in order to collect exchange rates data.
+    Connections to the server are kept alive and reused between requests.
 
     :param uri: (str) API endpoint URL
     :return: (list) Response data in json format
     """
 
     try:
-        response = requests.get(uri, headers={'Accept': 'application/json'})
+        response = _SESSION.get(uri, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        if isinstance((response_json := response.json()), dict):
+        if isinstance((response_json := _load_json(response.content)), dict):
             return [response_json]
         return response_json
     except Timeout:
@@ -84,11 +102,27 @@ def _send_request_to_nbp_api(uri: str) -> list:
     except ConnectionError:
         logger.warning('Failed to connect to the server.')
     except HTTPError as http_err:
-        logger.debug(f'HTTP error occurred: {http_err}')
+        logger.debug('HTTP error occurred: %s', http_err)
         if http_err.response.status_code == 404:
-            logger.debug(f'The data requested for the date range '
-                         f'{' - '.join(uri.split('/')[-3:-1])} are not available on the server')
+            logger.debug('The data requested for the date range %s - %s are not available on the server',
+                         *uri.split('/')[-3:-1])
     except RequestException as req_err:
-        logger.warning(f'Request error occurred: {req_err}')
+        logger.warning('Request error occurred: %s', req_err)
+    except ValueError as json_err:
+        logger.warning('Invalid JSON received: %s', json_err)
 
     return []
+
+
+def _load_json(content: bytes) -> dict | list:
+    """
+    Deserialize a JSON document.
+    orjson is used if it is installed, otherwise the standard library decoder is used.
+
+    :param content: (bytes) JSON document
+    :return: (dict | list) Deserialized data
+    """
+
+    if orjson:
+        return orjson.loads(content)
+    return json.loads(content)
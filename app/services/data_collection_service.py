@@ -3,8 +3,12 @@ Module used to collect data either from NBP API or from local SQLite database.
 Data newly collected from NBP API are saved in local SQLite database.
 """
 
+import logging
+import numpy as np
+
 from typing import Iterator
-from datetime import datetime, timedelta
+from itertools import chain
+from datetime import date, datetime
 
 from database_models.exchange_rates import ApiDatabaseKeysMapping
 from services.database_communication_service import save_data_into_database, get_dates_with_records
@@ -19,6 +23,7 @@ def gather_data_for_date_range(start_date: datetime.date, end_date: datetime.dat
     Function used for collection of the data from user specified data range.
     Firstly check if data is already present in the database.
     If any part of data is missing download it with use of NBP API.
+    Weekends are skipped, as NBP does not publish exchange rates on these days.
 
     :param start_date: (datetime.date) Start date of user specified range
     :param end_date: (datetime.date) End date of user specified range
@@ -26,18 +31,20 @@ def gather_data_for_date_range(start_date: datetime.date, end_date: datetime.dat
     :return: None
     """
 
-    logger.info(f'Start gathering data for date range {start_date} - {end_date} '
-                f'{f'for currencies: {', '.join(currency_codes)}' if currency_codes else ''}')
-    dates_with_records_iter = get_dates_with_records(start_date, end_date, currency_codes)
-    missing_dates_ranges = _calculate_missing_date_intervals(start_date, end_date, dates_with_records_iter)
+    logger.info('Start gathering data for date range %s - %s %s', start_date, end_date,
+                f'for currencies: {', '.join(currency_codes)}' if currency_codes else '')
+    dates_with_records = get_dates_with_records(start_date, end_date, currency_codes)
+    missing_dates_ranges = _calculate_missing_date_intervals(start_date, end_date, dates_with_records)
     if missing_dates_ranges:
-        is_data_collected = _collect_missing_data_from_nbp_api(missing_dates_ranges, currency_codes)
+        is_data_collected = _collect_missing_data_from_nbp_api(
+            _exclude_weekends(missing_dates_ranges), currency_codes
+        )
         if not is_data_collected and missing_dates_ranges == [(start_date, end_date)]:
             raise SystemExit('Data for the requested time range is not available on the NBP server')
 
 
 def _calculate_missing_date_intervals(start_date: datetime.date, end_date: datetime.date,
-                                      dates_with_records_iter: Iterator) -> list:
+                                      dates_with_records: list) -> list:
     """
     Based od requested date ranges (strat_date, end_date) -> set A
     and dates retrieved from the database -> set B
@@ -45,55 +52,72 @@ def _calculate_missing_date_intervals(start_date: datetime.date, end_date: datet
 
     :param start_date: (datetime.date) Start date of user specified range
     :param end_date: (datetime.date) End date of user specified range
-    :param dates_with_records_iter: (Iterator[pandas.core.frame.DataFrame]) Table with 'date' column only
+    :param dates_with_records: (List[datetime.date]) Dates sorted in ascending order
         (services.database_service.get_dates_with_records function output)
     :return: List of intervals (tuples) with date ranges
     """
 
-    missing_date_intervals = []
-    single_day, prev_date, = timedelta(days=1), None
-    for data_chunk in dates_with_records_iter:
-        if data_chunk.empty and not missing_date_intervals:
-            return [(start_date, end_date)]
-
-        for date in data_chunk['date']:
-            if prev_date and (date - single_day) > prev_date:
-                missing_date_intervals.append((prev_date + single_day, date - single_day))
-            elif not prev_date and (date > start_date):
-                missing_date_intervals.append((start_date, date - single_day))
-            prev_date = date
-    if prev_date < end_date:
-        missing_date_intervals.append((prev_date + single_day, end_date))
-    logger.debug(f'Calculated date ranges for which records are missing from the database: '
-                 f'{[f'{d1} - {d2}' for (d1, d2) in missing_date_intervals]}')
+    # Gaps are searched on date ordinals (days counted as plain integers).
+    # The known dates are surrounded with the days just outside the requested range,
+    # so that gaps at both ends of the range are detected the same way as the inner ones.
+    ordinals = np.concatenate([
+        [start_date.toordinal() - 1],
+        np.fromiter(map(date.toordinal, dates_with_records), dtype=np.int64, count=len(dates_with_records)),
+        [end_date.toordinal() + 1]
+    ])
+    gaps = np.flatnonzero(np.diff(ordinals) > 1)
+    missing_date_intervals = [
+        (date.fromordinal(gap_start), date.fromordinal(gap_end))
+        for gap_start, gap_end in zip((ordinals[gaps] + 1).tolist(), (ordinals[gaps + 1] - 1).tolist())
+    ]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('Calculated date ranges for which records are missing from the database: %s',
+                     [f'{d1} - {d2}' for (d1, d2) in missing_date_intervals])
     return missing_date_intervals
 
 
+def _exclude_weekends(dates_ranges: list) -> list:
+    """
+    Trim weekend days from both ends of date intervals, intervals containing weekend days only are dropped.
+    Intervals are not split on inner weekends, as NBP API skips the days without published rates within a range.
+
+    :param dates_ranges: (list) List of intervals (tuples) with date ranges
+    :return: List of intervals (tuples) with date ranges
+    """
+
+    business_days_intervals = []
+    for start_date, end_date in dates_ranges:
+        first_business_day = np.busday_offset(start_date, 0, roll='forward')
+        last_business_day = np.busday_offset(end_date, 0, roll='backward')
+        if first_business_day <= last_business_day:
+            business_days_intervals.append((first_business_day.item(), last_business_day.item()))
+    return business_days_intervals
+
+
 def _collect_missing_data_from_nbp_api(dates_ranges: list, currency_codes: tuple = None) -> bool:
     """
     Collect data from NBP API and save in the database.
+    Records from all responses are streamed into the database at once.
 
     :param dates_ranges: (list) List of intervals (tuples) with date ranges
     :param currency_codes: (tuple) Single currency code or multiple values
     :return: (bool) Is any data collected
     """
 
-    logger.debug(f'Start collecting missing data from NBP database...')
-    response_it = request_data_from_nbp_database(dates_ranges, currency_codes)
-    data_collected = False
-    for response in response_it:
-        data_collected = True
-        save_data_into_database(_align_json_data_with_database_model(response))
-    return data_collected
+    logger.debug('Start collecting missing data from NBP database...')
+    responses = list(request_data_from_nbp_database(dates_ranges, currency_codes))
+    if responses:
+        save_data_into_database(chain.from_iterable(map(_align_json_data_with_database_model, responses)))
+    return bool(responses)
 
 
-def _align_json_data_with_database_model(response_json: dict) -> list:
+def _align_json_data_with_database_model(response_json: dict) -> Iterator:
     """
     Function helper. Prepare data to being inserted into the database.
     Align data acquired via API response with local database model.
 
     :param response_json: (dict) Single response in json format
-    :return: List[dict]
+    :return: Iterator[dict]
     """
 
     if response_json.get('code', None):
@@ -102,49 +126,39 @@ def _align_json_data_with_database_model(response_json: dict) -> list:
         return _reformat_json_for_all_currencies_exchange_rates(response_json)
 
 
-def _reformat_json_for_single_currency_exchange_rates(response_json: dict) -> list:
+def _reformat_json_for_single_currency_exchange_rates(response_json: dict) -> Iterator:
     """
-    Convert a dictionary of exchange rates of a single currency into a list of dictionaries.
-    The returned list contains dictionaries with key names adapted to the database model column names.
+    Convert a dictionary of exchange rates of a single currency into a stream of dictionaries.
+    The yielded dictionaries have key names adapted to the database model column names.
 
     :param response_json: (dict) Single response in json format
-    :return: List[dict] [{'currency_code': ..., 'currency_rate': ..., 'date': ...},
-                         {'currency_code': ..., 'currency_rate': ..., 'date': ...}, ...]
+    :return: Iterator[dict] {'currency_code': ..., 'currency_rate': ..., 'date': ...},
+                            {'currency_code': ..., 'currency_rate': ..., 'date': ...}, ...
     """
 
-    response_data = []
-    currency_day_report = {
-        ApiDatabaseKeysMapping.currency.value: response_json['code']
-    }
+    currency_code = response_json['code']
     for exchange_rate in response_json['rates']:
-        currency_day_report.update({
+        yield {
+            ApiDatabaseKeysMapping.currency.value: currency_code,
             ApiDatabaseKeysMapping.mid.value: exchange_rate['mid'],
-            ApiDatabaseKeysMapping.effectiveDate.value:
-                datetime.strptime(exchange_rate['effectiveDate'], '%Y-%m-%d').date(),
-        })
-        response_data.append(currency_day_report.copy())
-    return response_data
+            ApiDatabaseKeysMapping.effectiveDate.value: date.fromisoformat(exchange_rate['effectiveDate']),
+        }
 
 
-def _reformat_json_for_all_currencies_exchange_rates(response_json: dict) -> list:
+def _reformat_json_for_all_currencies_exchange_rates(response_json: dict) -> Iterator:
     """
-    Convert a list of exchange rates of all available currencies into a list of dictionaries.
-    The returned list contains dictionaries with key names adapted to the database model column names.
+    Convert a list of exchange rates of all available currencies into a stream of dictionaries.
+    The yielded dictionaries have key names adapted to the database model column names.
 
     :param response_json: (dict) Single response in json format
-    :return: List[dict] [{'currency_code': ..., 'currency_rate': ..., 'date': ...},
-                         {'currency_code': ..., 'currency_rate': ..., 'date': ...}, ...]
+    :return: Iterator[dict] {'currency_code': ..., 'currency_rate': ..., 'date': ...},
+                            {'currency_code': ..., 'currency_rate': ..., 'date': ...}, ...
     """
 
-    response_data = []
-    currency_day_report = {
-        ApiDatabaseKeysMapping.effectiveDate.value:
-            datetime.strptime(response_json['effectiveDate'], '%Y-%m-%d').date(),
-    }
+    effective_date = date.fromisoformat(response_json['effectiveDate'])
     for exchange_rate in response_json['rates']:
-        currency_day_report.update({
+        yield {
+            ApiDatabaseKeysMapping.effectiveDate.value: effective_date,
             ApiDatabaseKeysMapping.currency.value: exchange_rate['code'],
             ApiDatabaseKeysMapping.mid.value: exchange_rate['mid']
-        })
-        response_data.append(currency_day_report.copy())
-    return response_data
+        }
@@ -4,12 +4,14 @@ Module for database interaction.
 
 import os
 import pandas
+import threading
 import sqlalchemy as db
 
-from typing import Iterator
-from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.pool import SingletonThreadPool
-from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from contextlib import closing
+from datetime import date, timedelta
+from typing import Iterable, Iterator
+from itertools import batched
+from operator import itemgetter
 
 from database_models.exchange_rates import ExchangeRates, Base
 from services.logging_service import get_logger
@@ -17,89 +19,162 @@ from services.variables import AVAILABLE_CURRENCIES
 
 logger = get_logger(__name__)
 
+INSERT_PAGE_SIZE = 5000
+SELECT_CHUNK_SIZE = 1000
+EXCHANGE_RATES_DTYPES = {'currency_code': 'category', 'currency_rate': 'float64'}
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+)
+SELECT_EXCHANGE_RATES = (
+    f'SELECT date, currency_code, currency_rate FROM {ExchangeRates.__tablename__} '
+    'WHERE date >= ? AND date < ? {currency_filter} '
+    'ORDER BY currency_code, date'
+)
+SELECT_DISTINCT_DATES = (
+    f'SELECT date FROM {ExchangeRates.__tablename__} '
+    'WHERE date >= ? AND date < ? {currency_filter} '
+    'GROUP BY date HAVING count(currency_code) >= ? ORDER BY date'
+)
+SQLITE_INSERT_OR_IGNORE = (
+    f'INSERT OR IGNORE INTO {ExchangeRates.__tablename__} (date, currency_code, currency_rate) VALUES (?, ?, ?)'
+)
+
 class _DatabaseOp:
 
     _INSTANCE = None
+    _INSTANCE_LOCK = threading.Lock()
 
     def __new__(cls):
         if not cls._INSTANCE:
-            cls._INSTANCE = super().__new__(cls)
+            with cls._INSTANCE_LOCK:
+                if not cls._INSTANCE:
+                    cls._INSTANCE = super().__new__(cls)
         return cls._INSTANCE
 
     def __init__(self):
+        if getattr(self, '_initialized', False):
+            return
+
         self._exchange_rates_table = ExchangeRates
         self._db_path = os.path.join(
             os.path.dirname(os.path.dirname(__file__)), f'{self._exchange_rates_table.__tablename__}.db'
         )
-        self._engine = db.create_engine(url=f'sqlite:///{self._db_path}', poolclass=SingletonThreadPool)
+        self._engine = db.create_engine(
+            url=f'sqlite:///{self._db_path}',
+            pool_size=1,
+            max_overflow=4
+        )
+        db.event.listen(self._engine, 'connect', self._set_sqlite_pragmas)
         self._create_database_if_not_exist()
+        self._initialized = True
+
+    @staticmethod
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Configure every new SQLite connection: write-ahead logging with relaxed syncing,
+        so that a commit does not wait for fsync of the whole database file.
+
+        :param dbapi_connection: (sqlite3.Connection) Newly opened DBAPI connection
+        :param connection_record: (sqlalchemy.pool.ConnectionPoolEntry) Pool entry of the connection
+        :return: None
+        """
 
+        cursor = dbapi_connection.cursor()
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
 
     def _create_database_if_not_exist(self):
         """
         Create a SQLite database in a temporary file.
+        Add indexes missing from a database created by an older version of the model.
         """
 
-        if not os.path.exists(self._db_path):
-            Base.metadata.create_all(bind=self._engine)
+        Base.metadata.create_all(bind=self._engine)
+        for index in self._exchange_rates_table.__table__.indexes:
+            index.create(bind=self._engine, checkfirst=True)
 
-    def insert(self, input_data: list):
+    def insert(self, input_data: Iterable):
         """
-        Execute Insert command into ExchangeRates table. Ignore input data that already exists in the database
+        Execute Insert command into ExchangeRates table. Ignore input data that already exists in the database.
+        All records are inserted within a single transaction, consumed in pages of INSERT_PAGE_SIZE rows.
+        Data is inserted with DB-API executemany on a raw SQLite connection, skipping SQLAlchemy statement
+        compilation and parameter processing. Dates are stored as ISO strings, same as sqlalchemy.Date does.
 
-        :param input_data: List[dict] e.g.
+        :param input_data: Iterable[dict] e.g.
             [{'currency_code': ..., 'currency_rate': ..., 'date': ...},
              {'currency_code': ..., 'currency_rate': ..., 'date': ...}, ...]
         :return: None
         """
 
-        insert_cmd = (
-            sqlite_insert(self._exchange_rates_table)
-            .values(input_data)
-            .on_conflict_do_nothing()
-        )
-        with Session(self._engine) as session:
-            session.execute(insert_cmd)
-            session.commit()
-
-    def _select(self, query: db.Select) -> Iterator:
+        get_values = itemgetter('date', 'currency_code', 'currency_rate')
+        connection = self._engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            for page in batched(input_data, INSERT_PAGE_SIZE):
+                rows = [(str(date), currency_code, currency_rate)
+                        for date, currency_code, currency_rate in map(get_values, page)]
+                cursor.executemany(SQLITE_INSERT_OR_IGNORE, rows)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _select(self, sql: str, params: tuple) -> Iterator:
         """
-        Send a select query to the ExchangeRates table. Returns output as pandas DataFrame iterator.
+        Send a raw SQL select query to the ExchangeRates table. Returns output as pandas DataFrame iterator.
+        Rows are fetched with DB-API in chunks of SELECT_CHUNK_SIZE rows, skipping SQLAlchemy result processing,
+        the connection stays open until the iterator is exhausted.
 
-        :param query: (sqlalchemy.sql.selectable.Select) Object returned from db.select()
+        :param sql: (str) SQL query with '?' placeholders
+        :param params: (tuple) Query parameters
         :return: Iterator[pandas.core.frame.DataFrame]
         """
 
-        session = sessionmaker(bind=self._engine)()
-        df_iter = pandas.read_sql(
-            sql=session.query(query.subquery()).statement,
-            con=self._engine,
-            chunksize=100
-        )
-        return df_iter
+        with closing(self._engine.raw_connection()) as connection:
+            yield from pandas.read_sql_query(
+                sql=sql,
+                con=connection.driver_connection,
+                params=params,
+                chunksize=SELECT_CHUNK_SIZE
+            )
+
+    def _select_scalar_column(self, sql: str, params: tuple) -> list:
+        """
+        Send a raw SQL select query for a single column with DB-API, skipping SQLAlchemy result processing.
+        Returns plain list of column values.
+
+        :param sql: (str) SQL query with '?' placeholders
+        :param params: (tuple) Query parameters
+        :return: List of values of the selected column
+        """
+
+        with closing(self._engine.raw_connection()) as connection:
+            cursor = connection.cursor()
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
 
     def select_all_data_between_dates(self, start_date, end_date) -> Iterator:
         """
-        Construct a query to collect exchange rates data for
-        all available currencies within a given date range and execute it.
+        Collect exchange rates data for all available currencies within a given date range.
 
         :param start_date: (datetime.date) Start date of user specified range
         :param end_date: (datetime.date) End date of user specified range
         :return: Iterator[pandas.core.frame.DataFrame]
         """
 
-        query = (
-            db.select(self._exchange_rates_table)
-            .where(self._exchange_rates_table.date.between(start_date, end_date))
-            .order_by(self._exchange_rates_table.currency_code, self._exchange_rates_table.date)
+        logger.debug('Select all data between dates %s - %s', start_date, end_date)
+        return self._select(
+            SELECT_EXCHANGE_RATES.format(currency_filter=''),
+            (start_date.isoformat(), (end_date + timedelta(days=1)).isoformat())
         )
-        logger.debug(f'Select all data between dates {start_date} - {end_date}')
-        return self._select(query)
 
     def select_specific_currency_data_between_dates(self, start_date, end_date, currency_codes) -> Iterator:
         """
-        Construct a query to collect exchange rates data for
-        specified currencies within a given date range and execute it.
+        Collect exchange rates data for specified currencies within a given date range.
 
         :param start_date: (datetime.date) Start date of user specified range
         :param end_date: (datetime.date) End date of user specified range
@@ -107,16 +182,13 @@ class _DatabaseOp:
         :return: Iterator[pandas.core.frame.DataFrame]
         """
 
-        query = (
-            db.select(self._exchange_rates_table)
-            .where(self._exchange_rates_table.date.between(start_date, end_date))
-            .filter(self._exchange_rates_table.currency_code.in_(currency_codes))
-            .order_by(self._exchange_rates_table.currency_code, self._exchange_rates_table.date)
+        logger.debug('Select all data between dates %s - %s for currencies %s', start_date, end_date, currency_codes)
+        return self._select(
+            SELECT_EXCHANGE_RATES.format(currency_filter=_currency_codes_filter(currency_codes)),
+            (start_date.isoformat(), (end_date + timedelta(days=1)).isoformat(), *currency_codes)
         )
-        logger.debug(f'Select all data between dates {start_date} - {end_date} for currencies {currency_codes}')
-        return self._select(query)
 
-    def select_distinct_dates_for_all_between_dates(self, start_date, end_date) -> Iterator:
+    def select_distinct_dates_for_all_between_dates(self, start_date, end_date) -> list:
         """
         Construct a query to collect distinct date values that stores records for
         all available currencies within a given date range and execute it.
@@ -126,22 +198,18 @@ class _DatabaseOp:
 
         :param start_date: (datetime.date) Start date of user specified range
         :param end_date: (datetime.date) End date of user specified range
-        :return: Iterator[pandas.core.frame.DataFrame]
+        :return: List[datetime.date]
         """
 
-        query = (
-            db.select(self._exchange_rates_table.date)
-            .where(self._exchange_rates_table.date.between(start_date, end_date))
-            .group_by(self._exchange_rates_table.date)
-            .order_by(self._exchange_rates_table.date)
-            .having(db.func.count(self._exchange_rates_table.currency_code) >= len(AVAILABLE_CURRENCIES))
+        logger.debug('Select dates that contains records for time frame %s - %s', start_date, end_date)
+        dates = self._select_scalar_column(
+            SELECT_DISTINCT_DATES.format(currency_filter=''),
+            (start_date.isoformat(), (end_date + timedelta(days=1)).isoformat(), len(AVAILABLE_CURRENCIES))
         )
-        logger.debug(f'Select dates that contains records for time frame {start_date} - {end_date}')
-        return self._select(query)
-
+        return list(map(date.fromisoformat, dates))
 
     def select_distinct_dates_for_specific_currency_between_dates(self, start_date, end_date,
-                                                                  currency_codes) -> Iterator:
+                                                                  currency_codes) -> list:
         """
         Construct a query to collect distinct date values that stores records for
         all specified currency codes within a given date range and execute it.
@@ -149,20 +217,26 @@ class _DatabaseOp:
         :param start_date: (datetime.date) Start date of user specified range
         :param end_date: (datetime.date) End date of user specified range
         :param currency_codes: (tuple) Currency codes
-        :return: Iterator[pandas.core.frame.DataFrame]
+        :return: List[datetime.date]
         """
 
-        query = (
-            db.select(self._exchange_rates_table.date)
-            .where(self._exchange_rates_table.date.between(start_date, end_date))
-            .filter(self._exchange_rates_table.currency_code.in_(currency_codes))
-            .group_by(self._exchange_rates_table.date)
-            .order_by(self._exchange_rates_table.date)
-            .having(db.func.count(self._exchange_rates_table.currency_code) >= len(currency_codes))
+        logger.debug('Select dates that contains records for time frame %s - %s for currencies %s',
+                     start_date, end_date, currency_codes)
+        dates = self._select_scalar_column(
+            SELECT_DISTINCT_DATES.format(currency_filter=_currency_codes_filter(currency_codes)),
+            (start_date.isoformat(), (end_date + timedelta(days=1)).isoformat(), *currency_codes, len(currency_codes))
         )
-        logger.debug(f'Select dates that contains records for time frame  {start_date} - {end_date} '
-                     f'for currencies {currency_codes}')
-        return self._select(query)
+        return list(map(date.fromisoformat, dates))
+
+def _currency_codes_filter(currency_codes: tuple) -> str:
+    """
+    Build SQL condition limiting records to given currency codes, with a '?' placeholder for every code.
+
+    :param currency_codes: (tuple) Currency codes
+    :return: (str) e.g. 'AND currency_code IN (?, ?)'
+    """
+
+    return f"AND currency_code IN ({', '.join('?' * len(currency_codes))})"
 
 
 def get_exchange_rates_data_from_database(start_date, end_date, currency_codes=None) -> Iterator:
@@ -170,6 +244,7 @@ def get_exchange_rates_data_from_database(start_date, end_date, currency_codes=N
     Interface for data collection.
     Allows to collect exchange rates data for
     specified or all currency codes within a given date range.
+    Columns of every chunk are converted to EXCHANGE_RATES_DTYPES, dates are kept as 'YYYY-MM-DD' strings.
 
     :param start_date: (datetime.date) Start date of user specified range
     :param end_date: (datetime.date) End date of user specified range
@@ -179,16 +254,17 @@ def get_exchange_rates_data_from_database(start_date, end_date, currency_codes=N
 
     db_instance = _DatabaseOp()
     if currency_codes:
-        return db_instance.select_specific_currency_data_between_dates(
+        df_iter = db_instance.select_specific_currency_data_between_dates(
             start_date, end_date, currency_codes
         )
     else:
-        return db_instance.select_all_data_between_dates(
+        df_iter = db_instance.select_all_data_between_dates(
             start_date, end_date
         )
+    return (df_chunk.astype(EXCHANGE_RATES_DTYPES) for df_chunk in df_iter)
 
 
-def get_dates_with_records(start_date, end_date, currency_codes=None) -> Iterator:
+def get_dates_with_records(start_date, end_date, currency_codes=None) -> list:
     """
     Interface for data collection.
     Allows to collect only distinct date values that stores records for
@@ -197,7 +273,7 @@ def get_dates_with_records(start_date, end_date, currency_codes=None) -> Iterato
     :param start_date: (datetime.date) Start date of user specified range
     :param end_date: (datetime.date) End date of user specified range
     :param currency_codes: (tuple) Currency codes
-    :return: Iterator[pandas.core.frame.DataFrame]
+    :return: List[datetime.date]
     """
 
     db_instance = _DatabaseOp()
@@ -210,12 +286,12 @@ def get_dates_with_records(start_date, end_date, currency_codes=None) -> Iterato
             start_date, end_date
         )
 
-def save_data_into_database(input_data: list) -> None:
+def save_data_into_database(input_data: Iterable) -> None:
     """
     Interface for data entry.
     Insert data into self._exchange_rates_table table.
 
-    :param input_data: List[dict] e.g.
+    :param input_data: Iterable[dict] e.g.
         [{'currency_code': ..., 'currency_rate': ..., 'date': ...},
          {'currency_code': ..., 'currency_rate': ..., 'date': ...}, ...]
     :return: None
@@ -18,11 +18,19 @@ def get_logger(name: str) -> logging.Logger:
 def configure_logger_globally(logging_lvl: str) -> None:
     """
     Define logging level.
+    Thread, process and caller information is not collected for log records as the log format does not use it.
+    Log calls should pass their arguments lazily, e.g. logger.debug('x=%s', x), so that messages below
+    the logging level are never formatted.
 
     :param logging_lvl: Logging level
     :return: None
     """
 
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    logging._srcfile = None
+
     if logging_lvl.upper() not in logging.getLevelNamesMapping():
         logging_lvl = 'INFO'
 
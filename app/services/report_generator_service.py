@@ -3,20 +3,33 @@ Module used to generate reports.
 """
 
 import json
-import os.path
+import numpy as np
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from contextlib import ExitStack
+from itertools import chain
 from pathlib import Path
-from typing import Iterator
+from types import MappingProxyType
+from typing import BinaryIO, Iterator
 
 from services.database_communication_service import get_exchange_rates_data_from_database
 from services.logging_service import get_logger
-from services.variables import curr_map
+from services.variables import CURRENCY_INDEX, MAX_IN_MEMORY_ROWS, curr_map
 
 logger = get_logger(__name__)
 
+# Report type aliases accepted by generate_report
+REPORT_TYPES = MappingProxyType(
+    {'h': 'historical', 'historical': 'historical', 'a': 'analytical', 'analytical': 'analytical'}
+)
+
 
-def generate_report(report_type: str, start_date, end_date, currency_codes: tuple, report_path: str) -> None:
+def generate_report(report_type: str, start_date, end_date, currency_codes: tuple, report_path: str | Path) -> None:
     """
     Interface for report generation.
     Determines which report should be generated:
@@ -31,116 +44,166 @@ def generate_report(report_type: str, start_date, end_date, currency_codes: tupl
     :param start_date: (datetime.date) Start date of user specified range
     :param end_date: (datetime.date) End date of user specified range
     :param currency_codes: (tuple) Single currency code or multiple values
-    :param report_path: (str) Target report path
+    :param report_path: (str | pathlib.Path) Target report path
     :return: None
     """
 
-    extension = Path(report_path).suffix
+    report_path = Path(report_path)
+    report_kind = REPORT_TYPES.get(report_type)
+    if report_kind is None:
+        logger.error('Unsupported report type: %s', report_type)
+        raise SystemExit(1)
+    report_writer = REPORT_WRITERS.get((report_kind, report_path.suffix))
+    if report_writer is None:
+        logger.error('Unsupported file extension type for report generation: %s', report_path.suffix)
+        raise SystemExit(1)
+
     df_iter = get_exchange_rates_data_from_database(start_date, end_date, currency_codes)
-    match report_type:
-        case 'h' | 'historical':
-            logger.debug('Generating a report with historical data.')
-            match extension:
-                case '.json':
-                    _generate_json_report_with_historical_data(df_iter, report_path)
-                case '.csv':
-                    _generate_csv_report_with_historical_data(df_iter, report_path)
-                case _:
-                    logger.error(f'Unsupported file extension type for report generation: {extension}')
-                    raise SystemExit(1)
-        case 'a' | 'analytical':
-            logger.debug('Generating a report containing the currencies whose rates have risen and fallen the most.')
-            analytical_data = _get_largest_exchange_rate_increase_and_decrease(df_iter)
-            match extension:
-                case '.json':
-                    _generate_json_report_with_analytical_data(analytical_data, report_path)
-                case '.csv':
-                    _generate_csv_report_with_analytical_data(analytical_data, report_path)
-                case _:
-                    logger.error(f'Unsupported file extension type for report generation: {extension}')
-                    raise SystemExit(1)
-        case _:
-            logger.error(f'Unsupported report type: {report_type}')
-            raise SystemExit(1)
-
-    _validate_if_report_exists(report_path)
-
-def _validate_if_report_exists(report_path: str) -> None:
+    if report_kind == 'historical':
+        logger.debug('Generating a report with historical data.')
+        report_data = df_iter
+    else:
+        logger.debug('Generating a report containing the currencies whose rates have risen and fallen the most.')
+        report_data = _get_largest_exchange_rate_increase_and_decrease(df_iter)
+    report_size = report_writer(report_data, report_path)
+
+    _validate_if_report_exists(report_path, report_size)
+
+def _validate_if_report_exists(report_path: Path, report_size: int) -> None:
     """
     Log a message.
+    The size returned by the report writer is used, so the report file is not checked again.
 
-    :param report_path: (str) Target report path
+    :param report_path: (pathlib.Path) Target report path
+    :param report_size: (int) Number of bytes written to the report
     :return: None
     """
 
-    if os.path.exists(report_path):
-        logger.info(f'Report generated successfully at {report_path}')
+    if report_size:
+        logger.info('Report generated successfully at %s (%s bytes)', report_path, report_size)
     else:
         logger.warning('Report was not generated. If the problem persists please contact the maintainer ;)')
 
-def _generate_csv_report_with_historical_data(df_iter: Iterator, report_path: str) -> None:
+def _generate_csv_report_with_historical_data(df_iter: Iterator, report_path: Path) -> int:
     """
     Generate a report in .csv format.
     Report will include all available historical data for requested currencies and date range.
 
     Note: The data extracted from the database is grouped into chunks.
     If the data of a currency has been divided into separate chunks, they need to be grouped again.
+    The report file is created only when the first currency is written, so no file is left when there is no data.
 
     :param df_iter: (Iterator[pandas.core.frame.DataFrame]) Data retrieved from the database in chunks
-    :param report_path: (str) Target report path
-    :return: None
+    :param report_path: (pathlib.Path) Target report path
+    :return: (int) Size of the report in bytes
     """
 
     last_currency_code = ''
-    for df_chunk in df_iter:
-        for currency_code, df in df_chunk.groupby([df_chunk['currency_code']]):
-            currency_exchange_rates = df[['date', 'currency_rate']]
-
-            with open(report_path, mode='a', encoding='utf-8') as csv_report:
+    with ExitStack() as stack:
+        csv_report = None
+        for df_chunk in df_iter:
+            dates = _format_dates(df_chunk['date'])
+            rates = df_chunk['currency_rate'].to_numpy()
+            grouped_indices = df_chunk.groupby('currency_code', sort=False, observed=True).indices
+            for currency_code, indices in grouped_indices.items():
+                if csv_report is None:
+                    csv_report = stack.enter_context(open(report_path, mode='w', encoding='utf-8', newline=''))
                 if currency_code != last_currency_code:
                     if last_currency_code:
                         csv_report.write('\n\n')
-                    csv_report.write(f'{str(currency_code[0])}\n')
+                    csv_report.write(f'{currency_code}\n')
                     csv_report.write(f'Date,Exchange rate\n')
-            currency_exchange_rates.to_csv(report_path, index=False, header=False, mode='a')
-            last_currency_code = currency_code
+                csv_report.write(''.join([f'{date},{rate}\n'
+                                          for date, rate in zip(dates[indices].tolist(), rates[indices].tolist())]))
+                last_currency_code = currency_code
+        return csv_report.tell() if csv_report else 0
 
 
-def _generate_json_report_with_historical_data(df_iter: Iterator, report_path: str) -> None:
+def _generate_json_report_with_historical_data(df_iter: Iterator, report_path: Path) -> int:
     """
     Generate a report in .json format.
     Report will include all available historical data for requested currencies and date range.
 
     Note: The data extracted from the database is grouped into chunks.
     If the data of a currency has been divided into separate chunks, they need to be grouped again.
+    Each currency record is written to the file as soon as the next currency starts,
+    so only a single currency is kept in memory.
 
     :param df_iter: (Iterator[pandas.core.frame.DataFrame]) Data retrieved from the database in chunks
-    :param report_path: (str) Target report path
+    :param report_path: (pathlib.Path) Target report path
+    :return: (int) Size of the report in bytes
+    """
+
+    with open(report_path, mode='wb') as json_file:
+        currency_report = None
+        first_record = True
+        for df_chunk in df_iter:
+            dates = _format_dates(df_chunk['date'])
+            rates = df_chunk['currency_rate'].to_numpy()
+            grouped_indices = df_chunk.groupby('currency_code', sort=False, observed=True).indices
+            for currency_code, indices in grouped_indices.items():
+                currency_exchange_rates_list = [{'date': date, 'rate': rate}
+                                                for date, rate in zip(dates[indices].tolist(), rates[indices].tolist())]
+                if currency_report and currency_code == currency_report['currency_code']:
+                    currency_report['rates'].extend(currency_exchange_rates_list)
+                    continue
+
+                if currency_report:
+                    _write_json_report_record(json_file, currency_report, first_record)
+                    first_record = False
+                currency_report = {
+                    'currency_code': currency_code,
+                    'rates': currency_exchange_rates_list
+                }
+
+        if currency_report:
+            _write_json_report_record(json_file, currency_report, first_record)
+            json_file.write(b'\n]')
+        else:
+            json_file.write(b'[]')
+        return json_file.tell()
+
+
+def _format_dates(dates: pd.Series) -> np.ndarray:
+    """
+    Convert dates to 'YYYY-MM-DD' strings.
+    The same dates repeat for every currency in a chunk, so each distinct date is formatted only once.
+
+    :param dates: (pandas.core.series.Series) Dates retrieved from the database
+    :return: (numpy.ndarray) Array of date strings aligned with the input
+    """
+
+    codes, unique_dates = pd.factorize(dates)
+    return np.asarray(unique_dates.astype(str), dtype=object)[codes]
+
+
+def _write_json_report_record(json_file: BinaryIO, record: dict, first_record: bool) -> None:
+    """
+    Write a single record of a JSON array to the report, formatted the same way as the whole array
+    dumped with two spaces indentation.
+
+    :param json_file: (BinaryIO) Report file opened in binary mode
+    :param record: (dict) Record to be written
+    :param first_record: (bool) Whether the record opens the array
     :return: None
     """
 
-    json_report = []
-    for df_chunk in df_iter:
+    json_file.write(b'[\n  ' if first_record else b',\n  ')
+    json_file.write(_dump_json(record).replace(b'\n', b'\n  '))
 
-        first_iter = True
-        for currency_code, df in df_chunk.groupby([df_chunk['currency_code']]):
-            currency_exchange_rates = df[['date', 'currency_rate']]
-            currency_exchange_rates_list = [{'date': str(record['date']), 'rate': record['currency_rate']}
-                                            for record in currency_exchange_rates.to_dict('records')]
-            if first_iter:
-                first_iter = False
-                if json_report and currency_code == json_report[-1]['currency_code']:
-                    json_report[-1]['rates'].extend(currency_exchange_rates_list)
-                    continue
 
-            currency_report = {
-                'currency_code': currency_code[0],
-                'rates': currency_exchange_rates_list
-            }
-            json_report.append(currency_report)
+def _dump_json(data) -> bytes:
+    """
+    Serialize data to UTF-8 encoded JSON indented with two spaces.
+    orjson is used if it is installed, otherwise the standard library encoder gives the same output.
 
-    with open(report_path, mode='w', encoding='utf-8') as json_file:
-        json_file.write(json.dumps(json_report, indent=4, ensure_ascii=False))
+    :param data: (dict | list) Data to be serialized
+    :return: (bytes) JSON document
+    """
+
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
 
 
 def _get_largest_exchange_rate_increase_and_decrease(df_iter: Iterator) -> dict:
@@ -148,89 +211,166 @@ def _get_largest_exchange_rate_increase_and_decrease(df_iter: Iterator) -> dict:
     Calculate which currencies have experienced the greatest increase or decrease in the given time frame.
 
     Note: The data extracted from the database is grouped into chunks.
-    If the data of a currency has been divided into separate chunks, they need to be grouped again.
+    If all chunks together have no more than MAX_IN_MEMORY_ROWS rows, they are joined into a single DataFrame.
+    Otherwise, if the data of a currency has been divided into separate chunks, the scan is continued
+    from the state carried over from the previous chunk. Buffered chunks are released as soon as they are scanned.
 
     :param df_iter: (Iterator[pandas.core.frame.DataFrame]) Data retrieved from the database in chunks
         already limited with user defined time frame.
-    :return: (dict) {'max_recorded_increase': namedtuple('curr_info', 'value'),
-                     'max_recorded_decrease': namedtuple('curr_info', 'value')}
+    :return: (dict) {'max_recorded_increase': namedtuple('curr_code', 'value'),
+                     'max_recorded_decrease': namedtuple('curr_code', 'value')}
     """
 
-    curr_max_inc = curr_max_dec = curr_map(None, float('-inf'))
-    last_chunk = curr_map(None, None)
-
+    buffered_chunks = []
+    buffered_rows = 0
     for df_chunk in df_iter:
-        grouped_chunks = df_chunk.groupby([df_chunk['currency_code']])
-        for currency_code, df in grouped_chunks:
-            if currency_code == last_chunk.curr_code:
-                df = pd.concat([last_chunk.value, df])
+        buffered_chunks.append(df_chunk)
+        buffered_rows += len(df_chunk)
+        if buffered_rows > MAX_IN_MEMORY_ROWS:
+            df_chunks = chain(_pop_buffered_chunks(buffered_chunks), df_iter)
+            break
+    else:
+        df_chunks = [pd.concat(buffered_chunks, ignore_index=True)] if buffered_chunks else []
+        buffered_chunks.clear()
+
+    currency_index = dict(CURRENCY_INDEX)
+    scan_states = _new_scan_states(len(currency_index))
+    for df_chunk in df_chunks:
+        if df_chunk.empty:
+            continue
 
-            max_inc, max_dec = _find_largest_increase_and_decrease(df['currency_rate'])
-            if max_inc > curr_max_inc.value:
-                curr_max_inc = curr_map(currency_code, max_inc)
-            if max_dec > curr_max_dec.value:
-                curr_max_dec = curr_map(currency_code, max_dec)
+        codes, chunk_currency_codes = pd.factorize(df_chunk['currency_code'])
+        chunk_rows = np.empty(len(chunk_currency_codes), dtype=np.intp)
+        for code, currency_code in enumerate(chunk_currency_codes):
+            row = currency_index.get(currency_code)
+            if row is None:
+                logger.debug('Currency %s is not listed in available currencies.', currency_code)
+                row = currency_index[currency_code] = len(currency_index)
+                scan_states = np.vstack((scan_states, _new_scan_states(1)))
+            chunk_rows[code] = row
 
-        last_row = grouped_chunks.last().iloc[-1]
-        last_chunk = curr_map(last_row.name, grouped_chunks.get_group((last_row.name,)))
+        _update_scan_states(scan_states, chunk_rows[codes], df_chunk['currency_rate'].to_numpy(dtype=np.float64))
 
-    return {'max_recorded_increase': curr_max_inc, 'max_recorded_decrease': curr_max_dec}
+    currency_codes = tuple(currency_index)
+    return {'max_recorded_increase': _get_currency_with_largest_value(currency_codes, scan_states[:, 1]),
+            'max_recorded_decrease': _get_currency_with_largest_value(currency_codes, scan_states[:, 3])}
 
 
-def _find_largest_increase_and_decrease(pd_series: pd.Series) -> (float, float):
+def _pop_buffered_chunks(buffered_chunks: list) -> Iterator:
+    """
+    Yield buffered chunks in their order, removing each from the buffer,
+    so that a chunk is released as soon as it has been scanned.
+
+    :param buffered_chunks: (list) Chunks read ahead from the data iterator, emptied in place
+    :return: Iterator[pandas.core.frame.DataFrame]
     """
-    Algorithm that finds the biggest differences between consecutive numbers in an iterable object.
+
+    buffered_chunks.reverse()
+    while buffered_chunks:
+        yield buffered_chunks.pop()
+
+
+def _update_scan_states(scan_states: np.ndarray, rows: np.ndarray, rates: np.ndarray) -> None:
+    """
+    Continue the largest increase and decrease scan of all currencies present in a chunk at once.
 
     Approach:
-     - For max increase: keep track of the smallest value and calculate subsequent differences.
-     - For max decrease: keep track of the largest value and calculate subsequent differences.
+     - Rates are arranged into a 2D array with one currency per row, padded with NaN at the end.
+     - Running minimum and maximum are accumulated along the rows, starting from the carried scan state.
+       fmin/fmax ignore the NaN padding, so the last column holds the overall minimum and maximum.
+
+    :param scan_states: (numpy.ndarray) (inc_min, max_increase, dec_max, max_decrease) rows, updated in place
+    :param rows: (numpy.ndarray) Scan state row of every rate, rates of a currency keep their order
+    :param rates: (numpy.ndarray) Exchange rates ordered by date within each currency
+    :return: None
+    """
+
+    order = np.argsort(rows, kind='stable')
+    state_rows, starts, counts = np.unique(rows[order], return_index=True, return_counts=True)
+    group_ids = np.repeat(np.arange(state_rows.size), counts)
+
+    grouped_rates = np.full((state_rows.size, counts.max()), np.nan)
+    grouped_rates[group_ids, np.arange(rows.size) - starts[group_ids]] = rates[order]
+    states = scan_states[state_rows]
+
+    buffer = np.fmin.accumulate(grouped_rates, axis=1)
+    np.fmin(buffer, states[:, [0]], out=buffer)
+    inc_min = buffer[:, -1].copy()
+    max_increase = np.fmax.reduce(np.subtract(grouped_rates, buffer, out=buffer), axis=1)
+
+    np.fmax.accumulate(grouped_rates, axis=1, out=buffer)
+    np.fmax(buffer, states[:, [2]], out=buffer)
+    dec_max = buffer[:, -1].copy()
+    max_decrease = np.fmax.reduce(np.subtract(buffer, grouped_rates, out=buffer), axis=1)
+
+    scan_states[state_rows] = np.column_stack((
+        inc_min, np.fmax(states[:, 1], max_increase), dec_max, np.fmax(states[:, 3], max_decrease)
+    ))
+
+
+def _new_scan_states(rows: int) -> np.ndarray:
+    """
+    Create rows of (inc_min, max_increase, dec_max, max_decrease) scan state for currencies not scanned yet.
+    Maximal changes start at -inf, so currencies without any records are never reported.
+
+    :param rows: (int) Number of currencies
+    :return: (numpy.ndarray) Array of shape (rows, 4)
+    """
+
+    scan_states = np.full((rows, 4), float('-inf'))
+    scan_states[:, 0] = float('inf')
+    return scan_states
+
+
+def _get_currency_with_largest_value(currency_codes: tuple, values: np.ndarray) -> curr_map:
+    """
+    Find the currency with the largest value. If several currencies share it, the first currency code
+    in alphabetical order is returned.
 
-    :param pd_series: (pandas.core.series.Series)
-    :return: (float, float) max_increase, max_decrease
+    :param currency_codes: (tuple) Currency codes ordered as the values
+    :param values: (numpy.ndarray) Value calculated for each currency
+    :return: (namedtuple('curr_code', 'value')) Currency code is None if no currency has been scanned
     """
 
-    inc_min, dec_max = float('inf'), float('-inf')
-    max_increase, max_decrease = 0, 0
-    for rate in pd_series:
-        inc_min = min(inc_min, rate)
-        max_increase = max(max_increase, rate - inc_min)
-        dec_max = max(dec_max, rate)
-        max_decrease = max(max_decrease, dec_max - rate)
-    return max_increase, max_decrease
+    largest_value = float(values.max())
+    if largest_value == float('-inf'):
+        return curr_map(None, largest_value)
+    return curr_map(min(currency_codes[row] for row in np.flatnonzero(values == largest_value)), largest_value)
 
 
-def _generate_csv_report_with_analytical_data(analytical_data: dict, report_path: str) -> None:
+def _generate_csv_report_with_analytical_data(analytical_data: dict, report_path: Path) -> int:
     """
     Generate a report in .csv format.
     The report will provide information on which currencies have experienced the greatest increase and decrease
     in the exchange rate considering the given time period.
 
     :param analytical_data: (dict) e.g.
-        {'max_recorded_increase': namedtuple('curr_info', 'value'),
-        'max_recorded_decrease': namedtuple('curr_info', 'value')}
-    :param report_path: (str) Target report path
-    :return:
+        {'max_recorded_increase': namedtuple('curr_code', 'value'),
+        'max_recorded_decrease': namedtuple('curr_code', 'value')}
+    :param report_path: (pathlib.Path) Target report path
+    :return: (int) Size of the report in bytes
     """
 
     with open(report_path, mode='w', encoding='utf-8') as csv_report:
         for change_type in analytical_data:
             if analytical_data[change_type].value and analytical_data[change_type].curr_code:
                 csv_report.write(f'{change_type}, {analytical_data[change_type].value}\n')
-                csv_report.write(f'currency_code, {analytical_data[change_type].curr_code[0]}\n\n')
+                csv_report.write(f'currency_code, {analytical_data[change_type].curr_code}\n\n')
             else:
                 csv_report.write(f'{change_type}, {None}\n')
+        return csv_report.tell()
 
 
-def _generate_json_report_with_analytical_data(analytical_data: dict, report_path: str) -> None:
+def _generate_json_report_with_analytical_data(analytical_data: dict, report_path: Path) -> int:
     """
     Generate a report in .json format.
     The report will provide information on which currencies have experienced the greatest increase and decrease
     in the exchange rate considering the given time period.
 
-    :param analytical_data: (dict) {'max_recorded_increase': namedtuple('curr_info', 'value'),
-                                    'max_recorded_decrease': namedtuple('curr_info', 'value')}
-    :param report_path: (str) Target report path
-    :return:
+    :param analytical_data: (dict) {'max_recorded_increase': namedtuple('curr_code', 'value'),
+                                    'max_recorded_decrease': namedtuple('curr_code', 'value')}
+    :param report_path: (pathlib.Path) Target report path
+    :return: (int) Size of the report in bytes
     """
 
     json_report = []
@@ -238,12 +378,22 @@ def _generate_json_report_with_analytical_data(analytical_data: dict, report_pat
         if analytical_data[change_type].value and analytical_data[change_type].curr_code:
             currency_report = {
                 change_type: analytical_data[change_type].value,
-                'currency_code': analytical_data[change_type].curr_code[0]
+                'currency_code': analytical_data[change_type].curr_code
             }
         else:
             currency_report = {
                 change_type: None
             }
         json_report.append(currency_report)
-    with open(report_path, mode='w', encoding='utf-8') as json_file:
-        json_file.write(json.dumps(json_report, indent=4, ensure_ascii=False))
+    with open(report_path, mode='wb') as json_file:
+        json_file.write(_dump_json(json_report))
+        return json_file.tell()
+
+
+# Report writer for every supported (report type, file extension) pair
+REPORT_WRITERS = {
+    ('historical', '.csv'): _generate_csv_report_with_historical_data,
+    ('historical', '.json'): _generate_json_report_with_historical_data,
+    ('analytical', '.csv'): _generate_csv_report_with_analytical_data,
+    ('analytical', '.json'): _generate_json_report_with_analytical_data,
+}
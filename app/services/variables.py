@@ -2,9 +2,14 @@ from collections import namedtuple
 
 curr_map = namedtuple('currency_map', ['curr_code', 'value'])
 
-AVAILABLE_CURRENCIES = [
+AVAILABLE_CURRENCIES = (
     'THB', 'USD', 'AUD', 'HKD', 'CAD', 'NZD', 'SGD', 'EUR', 'HUF',
     'CHF', 'GBP', 'UAH', 'JPY', 'CZK', 'DKK', 'ISK', 'NOK', 'SEK',
     'RON', 'BGN', 'TRY', 'ILS', 'CLP', 'PHP', 'MXN', 'ZAR', 'BRL',
     'MYR', 'IDR', 'INR', 'KRW', 'CNY', 'XDR'
-]
+)
+
+CURRENCY_INDEX = {currency_code: index for index, currency_code in enumerate(AVAILABLE_CURRENCIES)}
+
+# Analytical reports with up to this many rows are processed as a single DataFrame instead of chunk by chunk
+MAX_IN_MEMORY_ROWS = 1_000_000
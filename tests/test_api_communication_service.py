@@ -4,12 +4,14 @@ import unittest
 
 from unittest.mock import patch, Mock
 from requests.exceptions import Timeout, ConnectionError, HTTPError, RequestException
-from services.api_communication_service import _send_request_to_nbp_api, request_data_from_nbp_database
+from services.api_communication_service import (
+    REQUEST_TIMEOUT, _send_request_to_nbp_api, _iter_date_chunks, request_data_from_nbp_database
+)
 
 
 class TestAPICommunicationService(unittest.TestCase):
 
-    @patch('requests.get')
+    @patch('services.api_communication_service._SESSION.get')
     def test_send_request_success_dict(self, get_mock):
         """
         Function under test: _send_request_to_nbp_api
@@ -18,13 +20,14 @@ class TestAPICommunicationService(unittest.TestCase):
 
         response_mock = Mock()
         response_mock.raise_for_status.return_value = None
-        response_mock.json.return_value = {'currency_code': 'USD'}
+        response_mock.content = b'{"currency_code": "USD"}'
         get_mock.return_value = response_mock
 
         result = _send_request_to_nbp_api('http://test_uri')
         self.assertEqual(result, [{'currency_code': 'USD'}])
+        get_mock.assert_called_once_with('http://test_uri', timeout=REQUEST_TIMEOUT)
 
-    @patch('requests.get')
+    @patch('services.api_communication_service._SESSION.get')
     def test_send_request_success_list(self, get_mock):
         """
         Function under test: _send_request_to_nbp_api
@@ -33,13 +36,44 @@ class TestAPICommunicationService(unittest.TestCase):
 
         response_mock = Mock()
         response_mock.raise_for_status.return_value = None
-        response_mock.json.return_value = [{'currency_code': 'USD'}]
+        response_mock.content = b'[{"currency_code": "USD"}]'
         get_mock.return_value = response_mock
 
         result = _send_request_to_nbp_api('http://test_uri')
         self.assertEqual(result, [{'currency_code': 'USD'}])
 
-    @patch('requests.get', side_effect=Timeout)
+    @patch('services.api_communication_service._SESSION.get')
+    def test_send_request_invalid_json(self, get_mock):
+        """
+        Function under test: _send_request_to_nbp_api
+        Test that function returns an empty list when response body is not a valid JSON.
+        """
+
+        response_mock = Mock()
+        response_mock.raise_for_status.return_value = None
+        response_mock.content = b'<html>Not JSON</html>'
+        get_mock.return_value = response_mock
+
+        result = _send_request_to_nbp_api('http://test_uri')
+        self.assertEqual(result, [])
+
+    @patch('services.api_communication_service.orjson', None)
+    @patch('services.api_communication_service._SESSION.get')
+    def test_send_request_success_without_orjson(self, get_mock):
+        """
+        Function under test: _send_request_to_nbp_api
+        Test that response body is parsed with the standard library when orjson is not installed.
+        """
+
+        response_mock = Mock()
+        response_mock.raise_for_status.return_value = None
+        response_mock.content = b'[{"currency_code": "USD"}]'
+        get_mock.return_value = response_mock
+
+        result = _send_request_to_nbp_api('http://test_uri')
+        self.assertEqual(result, [{'currency_code': 'USD'}])
+
+    @patch('services.api_communication_service._SESSION.get', side_effect=Timeout)
     def test_send_request_timeout(self, *args):
         """
         Function under test: _send_request_to_nbp_api
@@ -49,7 +83,7 @@ class TestAPICommunicationService(unittest.TestCase):
         result = _send_request_to_nbp_api('http://test_uri')
         self.assertEqual(result, [])
 
-    @patch('requests.get', side_effect=ConnectionError)
+    @patch('services.api_communication_service._SESSION.get', side_effect=ConnectionError)
     def test_send_request_connection_error(self, *args):
         """
         Function under test: _send_request_to_nbp_api
@@ -59,7 +93,7 @@ class TestAPICommunicationService(unittest.TestCase):
         result = _send_request_to_nbp_api('http://test_uri')
         self.assertEqual(result, [])
 
-    @patch('requests.get')
+    @patch('services.api_communication_service._SESSION.get')
     def test_send_request_http_error(self, get_mock):
         """
         Function under test: _send_request_to_nbp_api
@@ -74,7 +108,7 @@ class TestAPICommunicationService(unittest.TestCase):
         result = _send_request_to_nbp_api('http://test_uri')
         self.assertEqual(result, [])
 
-    @patch('requests.get', side_effect=RequestException())
+    @patch('services.api_communication_service._SESSION.get', side_effect=RequestException())
     def test_send_request_request_exception(self, *args):
         """
         Function under test: _send_request_to_nbp_api
@@ -148,6 +182,38 @@ class TestAPICommunicationService(unittest.TestCase):
         self.assertEqual(result[1], {'currency_code': 'USD'})
         self.assertEqual(send_request_func_mock.call_count, 2)
 
+    @patch('services.api_communication_service._send_request_to_nbp_api')
+    def test_request_data_from_nbp_database_keeps_responses_order(self, send_request_func_mock):
+        """
+        Function under test: request_data_from_nbp_database
+        Requests are sent concurrently, check that responses are returned in the order of requested URIs.
+        """
+
+        start_date = datetime.date(2025, 1, 1)
+        end_date = datetime.date(2025, 1, 10)
+        dates_ranges = [(start_date, end_date)]
+        currency_codes = ('USD', 'EUR', 'CHF')
+        send_request_func_mock.side_effect = lambda uri: [uri.split('/')[-4]]
+
+        result = list(request_data_from_nbp_database(dates_ranges, currency_codes))
+        self.assertEqual(result, ['USD', 'EUR', 'CHF'])
+        self.assertEqual(send_request_func_mock.call_count, 3)
+
+
+    def test_iter_date_chunks(self):
+        """
+        Function under test: _iter_date_chunks
+        Test that chunks are no longer than 93 days and cover the whole range without gaps.
+        """
+
+        start_date = datetime.date(2025, 1, 1)
+        end_date = start_date + datetime.timedelta(days=186)
+
+        result = list(_iter_date_chunks(start_date, end_date))
+        self.assertEqual(3, len(result))
+        self.assertEqual((start_date, start_date + datetime.timedelta(days=92)), result[0])
+        self.assertEqual((start_date + datetime.timedelta(days=93), start_date + datetime.timedelta(days=185)), result[1])
+        self.assertEqual((end_date, end_date), result[2])
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,10 +1,9 @@
 import unittest
-import pandas as pd
 
 from datetime import date
 from unittest.mock import patch
 from services.data_collection_service import (
-    gather_data_for_date_range, _validate_data_gathering, _calculate_missing_date_intervals,
+    gather_data_for_date_range, _calculate_missing_date_intervals, _exclude_weekends,
     _collect_missing_data_from_nbp_api, _align_json_data_with_database_model,
     _reformat_json_for_single_currency_exchange_rates, _reformat_json_for_all_currencies_exchange_rates
 )
@@ -46,7 +45,7 @@ class TestJSONFormatting(unittest.TestCase):
     def test_reformat_json_for_single_currency_exchange_rates(self):
         """
         Function under test: _reformat_json_for_single_currency_exchange_rates
-        Test if items in returned lists are dictionaries with proper keys.
+        Test if yielded items are dictionaries with proper keys.
         """
 
         test_data = {
@@ -67,7 +66,7 @@ class TestJSONFormatting(unittest.TestCase):
             ]
         }
 
-        result = _reformat_json_for_single_currency_exchange_rates(test_data)
+        result = list(_reformat_json_for_single_currency_exchange_rates(test_data))
         self.assertEqual(2, len(result))
         self.assertIsInstance(result[0], dict)
         self.assertIn('currency_code', result[0])
@@ -77,7 +76,7 @@ class TestJSONFormatting(unittest.TestCase):
     def test_reformat_json_for_all_currencies_exchange_rates(self):
         """
         Function under test: _reformat_json_for_all_currencies_exchange_rates
-        Test if items in returned lists are dictionaries with proper keys.
+        Test if yielded items are dictionaries with proper keys.
         """
 
         test_data = {
@@ -102,7 +101,7 @@ class TestJSONFormatting(unittest.TestCase):
             ]
         }
 
-        result = _reformat_json_for_all_currencies_exchange_rates(test_data)
+        result = list(_reformat_json_for_all_currencies_exchange_rates(test_data))
         self.assertEqual(3, len(result))
         self.assertIsInstance(result[0], dict)
         self.assertIn('currency_code', result[0])
@@ -119,15 +118,12 @@ class TestDataGathering(unittest.TestCase):
 
         start_date = date(2025,1,1)
         end_date = date(2025,2,1)
-        dates_with_records = pd.DataFrame({
-            'date': [date(2025, 1, 4),
-                     date(2025, 1, 5),
-                     date(2025, 1, 8),
-                     date(2025, 1, 9)],
-        })
-        dates_with_records_gen = [dates_with_records]
+        dates_with_records = [date(2025, 1, 4),
+                              date(2025, 1, 5),
+                              date(2025, 1, 8),
+                              date(2025, 1, 9)]
 
-        result = _calculate_missing_date_intervals(start_date, end_date, dates_with_records_gen)
+        result = _calculate_missing_date_intervals(start_date, end_date, dates_with_records)
 
         self.assertEqual(3, len(result))
         self.assertEqual((date(2025, 1, 1), date(2025, 1, 3)), result[0])
@@ -142,17 +138,67 @@ class TestDataGathering(unittest.TestCase):
 
         start_date = date(2025,1,4)
         end_date = date(2025,1,7)
-        dates_with_records = pd.DataFrame({
-            'date': [date(2025, 1, 4),
-                     date(2025, 1, 5),
-                     date(2025, 1, 6),
-                     date(2025, 1, 7)],
-        })
-        dates_with_records_gen = [dates_with_records]
-
-        result = _calculate_missing_date_intervals(start_date, end_date, dates_with_records_gen)
+        dates_with_records = [date(2025, 1, 4),
+                              date(2025, 1, 5),
+                              date(2025, 1, 6),
+                              date(2025, 1, 7)]
+
+        result = _calculate_missing_date_intervals(start_date, end_date, dates_with_records)
         self.assertEqual(0, len(result))
 
+    def test_calculate_missing_date_intervals_no_records(self):
+        """
+        Function under test: _calculate_missing_date_intervals
+        Test that the whole requested range is returned if there are no records in the database.
+        """
+
+        start_date = date(2025, 1, 4)
+        end_date = date(2025, 1, 7)
+        result = _calculate_missing_date_intervals(start_date, end_date, [])
+        self.assertEqual([(start_date, end_date)], result)
+
+    def test_exclude_weekends(self):
+        """
+        Function under test: _exclude_weekends
+        Test that weekend days are trimmed from interval ends, inner weekends do not split intervals
+        and weekend-only intervals are dropped.
+        """
+
+        dates_ranges = [
+            (date(2025, 1, 1), date(2025, 1, 14)),
+            (date(2025, 1, 18), date(2025, 1, 19)),
+            (date(2025, 1, 25), date(2025, 2, 9))
+        ]
+
+        result = _exclude_weekends(dates_ranges)
+        self.assertEqual([
+            (date(2025, 1, 1), date(2025, 1, 14)),
+            (date(2025, 1, 27), date(2025, 2, 7))
+        ], result)
+
+    @patch('services.data_collection_service.save_data_into_database')
+    @patch('services.data_collection_service.request_data_from_nbp_database', return_value=[{}])
+    @patch('services.data_collection_service.get_dates_with_records', return_value=[])
+    def test_gather_data_for_date_range_requests_whole_interval(self, mock_db_func, mock_api_func, *args):
+        """
+        Function under test: gather_data_for_date_range
+        Test that a missing interval spanning many weekends is requested as a single interval
+        """
+
+        gather_data_for_date_range(date(2024, 1, 1), date(2024, 12, 31))
+        mock_api_func.assert_called_once_with([(date(2024, 1, 1), date(2024, 12, 31))], None)
+
+    @patch('services.data_collection_service.request_data_from_nbp_database', return_value=[])
+    @patch('services.data_collection_service.get_dates_with_records', return_value=[])
+    def test_gather_data_for_weekend_only_range_raises_SystemExit(self, *args):
+        """
+        Function under test: gather_data_for_date_range
+        Test that function raises an exception SystemExit when requested range covers a weekend only
+        """
+
+        with self.assertRaises(SystemExit):
+            gather_data_for_date_range(date(2025, 1, 4), date(2025, 1, 5))
+
     @patch('services.data_collection_service.request_data_from_nbp_database')
     def test_collect_missing_data_from_nbp_api_call_request(self, mock_func):
         """
@@ -173,7 +219,7 @@ class TestDataGathering(unittest.TestCase):
     def test_collect_missing_data_from_nbp_api_save_to_db(self, mock_db_func, mock_api_func):
         """
         Function under test: _collect_missing_data_from_nbp_api
-        Test that DB interface function will be called twice
+        Test that DB interface function will be called once with records from all responses
         """
 
         test_data = [
@@ -211,20 +257,8 @@ class TestDataGathering(unittest.TestCase):
         mock_api_func.return_value = test_data
 
         _collect_missing_data_from_nbp_api(dates_ranges, currency_codes)
-        mock_db_func.AssertNumberOfCalls(2)
-
-    @patch('services.data_collection_service._calculate_missing_date_intervals')
-    def test_validate_data_gathering_raises_SystemExit(self, mock_func):
-        """
-        Function under test: _validate_data_gathering
-        Test that function raises an exception SystemExit
-        """
-
-        start_date = date(2025, 1, 4)
-        end_date = date(2025, 1, 7)
-        mock_func.return_value = [(start_date, end_date)]
-        with self.assertRaises(SystemExit):
-            _validate_data_gathering(start_date, end_date)
+        mock_db_func.assert_called_once()
+        self.assertEqual(2, len(list(mock_db_func.call_args.args[0])))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,15 +1,20 @@
 
+import os
+import tempfile
 import unittest
 import pandas as pd
 
 from typing import Generator
 from datetime import date
-from sqlalchemy import select, Engine
+from sqlalchemy import select, Engine, QueuePool
 from sqlalchemy.orm import Session
 from unittest.mock import patch, MagicMock, Mock
 from database_models.exchange_rates import ExchangeRates
 from services.database_communication_service import (
     _DatabaseOp,
+    AVAILABLE_CURRENCIES,
+    SELECT_EXCHANGE_RATES,
+    SQLITE_INSERT_OR_IGNORE,
     get_exchange_rates_data_from_database,
     get_dates_with_records,
     save_data_into_database
@@ -18,14 +23,24 @@ from services.database_communication_service import (
 
 
 class TestDatabaseOp(unittest.TestCase):
-    @patch('services.database_communication_service.os.path')
-    def setUp(self, mock_path):
-        mock_path.exists.return_value = True
-        mock_path.join.return_value = ":memory:"
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_patcher = patch(
+            'services.database_communication_service.os.path.join',
+            return_value=os.path.join(self.tmp_dir.name, 'exchange_rates.db')
+        )
+        self.path_patcher.start()
 
+        _DatabaseOp._INSTANCE = None
         self.db_op = _DatabaseOp()
         _DatabaseOp._INSTANCE = None
 
+    def tearDown(self):
+        self.path_patcher.stop()
+        self.db_op._engine.dispose()
+        _DatabaseOp._INSTANCE = None
+        self.tmp_dir.cleanup()
+
     def test_singleton_pattern(self):
         """
         Test that _DatabaseOp implements singleton pattern correctly
@@ -35,43 +50,104 @@ class TestDatabaseOp(unittest.TestCase):
         instance2 = _DatabaseOp()
         self.assertIs(instance1, instance2)
 
-    @patch('services.database_communication_service.Session')
-    def test_insert(self, mock_session):
+    @patch('services.database_communication_service._DatabaseOp._create_database_if_not_exist')
+    def test_singleton_is_initialized_once(self, mock_create_database):
+        """
+        Test that repeated _DatabaseOp() calls do not set up the database again
+        """
+
+        instance = _DatabaseOp()
+        _DatabaseOp()
+        instance._engine.dispose()
+        mock_create_database.assert_called_once()
+
+    def test_connection_pool(self):
+        """
+        Test that connections are kept in a pool sized for a single-threaded application
+        """
+
+        pool = self.db_op._engine.pool
+        self.assertIsInstance(pool, QueuePool)
+        self.assertEqual(1, pool.size())
+
+    def test_sqlite_pragmas(self):
+        """
+        Test that connections to the database use write-ahead logging with relaxed syncing
+        """
+
+        with self.db_op._engine.connect() as connection:
+            self.assertEqual('wal', connection.exec_driver_sql('PRAGMA journal_mode').scalar())
+            self.assertEqual(1, connection.exec_driver_sql('PRAGMA synchronous').scalar())
+            self.assertEqual(2, connection.exec_driver_sql('PRAGMA temp_store').scalar())
+
+    def test_insert_sqlite(self):
         """
-        Test insert operation
+        Test insert operation on SQLite uses DB-API executemany on a raw connection
         """
 
-        mock_session_instance = Mock(spec=Session)
-        mock_session.return_value.__enter__.return_value = mock_session_instance
         test_data = [
             {
-                'currency_name': 'euro',
                 'currency_code': 'EUR',
                 'currency_rate': 1.0,
                 'date': date(2024, 1, 1)
             }
         ]
+        raw_connection = MagicMock()
+
+        with patch.object(self.db_op._engine, 'raw_connection', return_value=raw_connection):
+            self.db_op.insert(test_data)
+        raw_connection.cursor.return_value.executemany.assert_called_once_with(
+            SQLITE_INSERT_OR_IGNORE, [('2024-01-01', 'EUR', 1.0)]
+        )
+        raw_connection.commit.assert_called_once()
+        raw_connection.close.assert_called_once()
+
+    def test_insert_sqlite_ignores_existing_records(self):
+        """
+        Test that records inserted on SQLite are read back as dates and duplicates are ignored
+        """
+
+        test_data = [
+            {'currency_code': 'EUR', 'currency_rate': 1.0, 'date': date(2024, 1, 1)},
+            {'currency_code': 'USD', 'currency_rate': 4.0, 'date': date(2024, 1, 1)}
+        ]
 
         self.db_op.insert(test_data)
-        mock_session_instance.execute.assert_called_once()
-        mock_session_instance.commit.assert_called_once()
+        self.db_op.insert(test_data[:1])
+        with Session(self.db_op._engine) as session:
+            records = session.execute(select(ExchangeRates).order_by(ExchangeRates.currency_code)).scalars().all()
+        self.assertEqual([(date(2024, 1, 1), 'EUR', 1.0), (date(2024, 1, 1), 'USD', 4.0)],
+                         [(record.date, record.currency_code, record.currency_rate) for record in records])
 
-    @patch('services.database_communication_service.sessionmaker')
-    def test_select(self, mock_sessionmaker):
+    def test_select(self):
         """
         Test select operation
         """
 
-        mock_session_instance = Mock(spec=Session)
-        mock_sessionmaker.return_value.__enter__.return_value = mock_session_instance
-        test_query = select(ExchangeRates)
-
-        result = self.db_op._select(test_query)
+        result = self.db_op._select(SELECT_EXCHANGE_RATES.format(currency_filter=''), ('2024-01-01', '2024-01-02'))
         self.assertIsInstance(result, Generator)
 
-    @patch('services.database_communication_service.db.select')
+    @patch('services.database_communication_service.SELECT_CHUNK_SIZE', 2)
+    def test_select_streams_chunks(self):
+        """
+        Test that select output is streamed in DataFrames of at most SELECT_CHUNK_SIZE rows
+        """
+
+        test_data = [
+            {'currency_code': currency_code, 'currency_rate': 1.0, 'date': date(2024, 1, 1)}
+            for currency_code in ('AUD', 'EUR', 'USD')
+        ]
+        self.db_op.insert(test_data)
+
+        chunks = list(self.db_op._select(SELECT_EXCHANGE_RATES.format(currency_filter=''),
+                                         ('2024-01-01', '2024-01-02')))
+        self.assertEqual([2, 1], [len(chunk) for chunk in chunks])
+        self.assertEqual(['date', 'currency_code', 'currency_rate'], list(chunks[0].columns))
+        self.assertEqual(['AUD', 'EUR', 'USD'], pd.concat(chunks)['currency_code'].tolist())
+        self.assertEqual('2024-01-01', chunks[0]['date'][0])
+
     @patch('services.database_communication_service._DatabaseOp._select')
-    def test_select_all_data_between_dates(self, mock_internal_select, mock_select):
+    def test_select_all_data_between_dates(self, mock_internal_select):
         """
         Function under test: select_all_data_between_dates
         Validate function flow.
@@ -81,12 +157,13 @@ class TestDatabaseOp(unittest.TestCase):
         end_date = date(2025, 1, 2)
 
         self.db_op.select_all_data_between_dates(start_date, end_date)
-        mock_select.assert_called_once()
         mock_internal_select.assert_called_once()
+        sql, params = mock_internal_select.call_args.args
+        self.assertNotIn('currency_code IN', sql)
+        self.assertEqual(('2025-01-01', '2025-01-03'), params)
 
-    @patch('services.database_communication_service.db.select')
     @patch('services.database_communication_service._DatabaseOp._select')
-    def test_select_specific_currency_data_between_dates(self, mock_internal_select, mock_select):
+    def test_select_specific_currency_data_between_dates(self, mock_internal_select):
         """
         Function under test: select_specific_currency_data_between_dates
         Validate function flow.
@@ -97,12 +174,46 @@ class TestDatabaseOp(unittest.TestCase):
         currency_codes = ('EUR', 'USD')
 
         self.db_op.select_specific_currency_data_between_dates(start_date, end_date, currency_codes)
-        mock_select.assert_called_once()
         mock_internal_select.assert_called_once()
+        sql, params = mock_internal_select.call_args.args
+        self.assertIn('currency_code IN (?, ?)', sql)
+        self.assertEqual(('2025-01-01', '2025-01-03', 'EUR', 'USD'), params)
 
-    @patch('services.database_communication_service.db.select')
     @patch('services.database_communication_service._DatabaseOp._select')
-    def test_select_distinct_dates_all_between_dates(self, mock_internal_select, mock_select):
+    def test_select_data_between_dates_uses_half_open_range(self, mock_internal_select):
+        """
+        Functions under test: select_all_data_between_dates, select_specific_currency_data_between_dates
+        Test that the date range is queried with comparisons usable by the index instead of BETWEEN.
+        """
+
+        self.db_op.select_all_data_between_dates(date(2025, 1, 1), date(2025, 1, 31))
+        self.db_op.select_specific_currency_data_between_dates(date(2025, 1, 1), date(2025, 1, 31), ('EUR',))
+
+        for call in mock_internal_select.call_args_list:
+            sql, params = call.args
+            self.assertIn('date >= ? AND date < ?', sql)
+            self.assertNotIn('BETWEEN', sql)
+            self.assertEqual(('2025-01-01', '2025-02-01'), params[:2])
+
+    def test_select_specific_currency_data_between_dates_from_database(self):
+        """
+        Function under test: select_specific_currency_data_between_dates
+        Test against a database that only requested currencies within the inclusive date range are returned.
+        """
+
+        self.db_op.insert([
+            {'currency_code': currency_code, 'currency_rate': 1.0, 'date': day}
+            for currency_code in ('EUR', 'USD', 'CHF')
+            for day in (date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3))
+        ])
+
+        df = pd.concat(self.db_op.select_specific_currency_data_between_dates(
+            date(2025, 1, 2), date(2025, 1, 3), ('USD', 'EUR')))
+        self.assertEqual(['EUR', 'EUR', 'USD', 'USD'], df['currency_code'].tolist())
+        self.assertEqual(['2025-01-02', '2025-01-03'] * 2, df['date'].tolist())
+
+    @patch('services.database_communication_service._DatabaseOp._select_scalar_column')
+    def test_select_distinct_dates_all_between_dates(self, mock_internal_select):
         """
         Function under test: select_distinct_dates_for_all_between_dates
         Validate function flow.
@@ -110,14 +221,17 @@ class TestDatabaseOp(unittest.TestCase):
 
         start_date = date(2025, 1, 1)
         end_date = date(2025, 1, 2)
+        mock_internal_select.return_value = ['2025-01-02']
 
-        self.db_op.select_distinct_dates_for_all_between_dates(start_date, end_date)
-        mock_select.assert_called_once()
+        result = self.db_op.select_distinct_dates_for_all_between_dates(start_date, end_date)
         mock_internal_select.assert_called_once()
+        sql, params = mock_internal_select.call_args.args
+        self.assertNotIn('currency_code IN', sql)
+        self.assertEqual(('2025-01-01', '2025-01-03', len(AVAILABLE_CURRENCIES)), params)
+        self.assertEqual([date(2025, 1, 2)], result)
 
-    @patch('services.database_communication_service.db.select')
-    @patch('services.database_communication_service._DatabaseOp._select')
-    def test_select_distinct_dates_for_specific_currency_between_dates(self, mock_internal_select, mock_select):
+    @patch('services.database_communication_service._DatabaseOp._select_scalar_column')
+    def test_select_distinct_dates_for_specific_currency_between_dates(self, mock_internal_select):
         """
         Function under test: select_distinct_dates_for_specific_currency_between_dates
         Validate function flow.
@@ -126,12 +240,47 @@ class TestDatabaseOp(unittest.TestCase):
         start_date = date(2025, 1, 1)
         end_date = date(2025, 1, 2)
         currency_codes = ('EUR', 'USD')
+        mock_internal_select.return_value = ['2025-01-01']
 
-        self.db_op.select_distinct_dates_for_specific_currency_between_dates(start_date, end_date, currency_codes)
-        mock_select.assert_called_once()
+        result = self.db_op.select_distinct_dates_for_specific_currency_between_dates(
+            start_date, end_date, currency_codes)
         mock_internal_select.assert_called_once()
+        sql, params = mock_internal_select.call_args.args
+        self.assertIn('currency_code IN (?, ?)', sql)
+        self.assertEqual(('2025-01-01', '2025-01-03', 'EUR', 'USD', 2), params)
+        self.assertEqual([date(2025, 1, 1)], result)
 
+    @patch('services.database_communication_service.AVAILABLE_CURRENCIES', ('EUR', 'USD'))
+    def test_select_distinct_dates_with_complete_records(self):
+        """
+        Functions under test: select_distinct_dates_for_all_between_dates,
+            select_distinct_dates_for_specific_currency_between_dates
+        Test against a database that only dates with records for all requested currencies are returned.
+        """
 
+        self.db_op.insert([
+            {'currency_code': 'EUR', 'currency_rate': 4.3, 'date': date(2025, 1, 1)},
+            {'currency_code': 'USD', 'currency_rate': 4.1, 'date': date(2025, 1, 1)},
+            {'currency_code': 'EUR', 'currency_rate': 4.2, 'date': date(2025, 1, 2)},
+            {'currency_code': 'EUR', 'currency_rate': 4.2, 'date': date(2025, 1, 3)},
+            {'currency_code': 'USD', 'currency_rate': 4.0, 'date': date(2025, 1, 3)},
+            {'currency_code': 'EUR', 'currency_rate': 4.4, 'date': date(2025, 1, 4)},
+        ])
+
+        self.assertEqual(
+            [date(2025, 1, 1), date(2025, 1, 3)],
+            self.db_op.select_distinct_dates_for_all_between_dates(date(2025, 1, 1), date(2025, 1, 3))
+        )
+        self.assertEqual(
+            [date(2025, 1, 2), date(2025, 1, 3)],
+            self.db_op.select_distinct_dates_for_specific_currency_between_dates(
+                date(2025, 1, 2), date(2025, 1, 3), ('EUR',))
+        )
+        self.assertEqual(
+            [date(2025, 1, 3)],
+            self.db_op.select_distinct_dates_for_specific_currency_between_dates(
+                date(2025, 1, 2), date(2025, 1, 4), ('EUR', 'USD'))
+        )
 
 
 class TestInterfaceSelectQueries(unittest.TestCase):
@@ -169,6 +318,23 @@ class TestInterfaceSelectQueries(unittest.TestCase):
             self.start_date, self.end_date, self.currency_codes
         )
 
+    def test_get_exchange_rates_data_dtypes(self):
+        """
+        Function under test: get_exchange_rates_data_from_database
+        Test that columns of the returned chunks are converted to expected types.
+        """
+
+        self.mock_db_instance.select_all_data_between_dates.return_value = [pd.DataFrame({
+            'date': [date(2024, 1, 1), date(2024, 1, 1)],
+            'currency_code': ['EUR', 'USD'],
+            'currency_rate': [4, 4.1]
+        })]
+
+        df_chunk, = get_exchange_rates_data_from_database(self.start_date, self.end_date)
+        self.assertIsInstance(df_chunk['currency_code'].dtype, pd.CategoricalDtype)
+        self.assertEqual('float64', df_chunk['currency_rate'].dtype)
+        self.assertEqual(['EUR', 'USD'], df_chunk['currency_code'].tolist())
+
     def test_get_dates_with_records_all_currencies(self):
         """
         Function under test: get_dates_with_records
@@ -1,7 +1,7 @@
 import sys
 import unittest
 import logging
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, MagicMock
 from services.logging_service import get_logger, configure_logger_globally
 
 
@@ -36,6 +36,17 @@ class TestLoggingService(unittest.TestCase):
         self.assertIsNot(logger1, logger2)
         self.assertNotEqual(logger1.name, logger2.name)
 
+    def test_get_logger_repeated_calls_do_not_add_handlers(self):
+        """
+        Function under test: get_logger
+        Test that repeated calls return the same logger without attaching handlers to it
+        """
+
+        logger1 = get_logger("test_logger_repeated")
+        logger2 = get_logger("test_logger_repeated")
+        self.assertIs(logger1, logger2)
+        self.assertEqual([], logger2.handlers)
+
     def test_get_logger_logging_msg(self):
         """
         Function under test: get_logger
@@ -81,5 +92,30 @@ class TestLoggingService(unittest.TestCase):
             self.assertEqual( ['INFO:test_logger:Test info message'], logs.output)
 
 
+    @patch.multiple('logging', logThreads=True, logProcesses=True, logMultiprocessing=True, _srcfile=__file__)
+    def test_configure_logger_globally_disables_unused_record_attributes(self):
+        """
+        Function under test: configure_logger_globally
+        Test that thread, process and caller information is not collected for log records
+        """
+
+        configure_logger_globally('INFO')
+        self.assertFalse(logging.logThreads)
+        self.assertFalse(logging.logProcesses)
+        self.assertFalse(logging.logMultiprocessing)
+        self.assertIsNone(logging._srcfile)
+
+    def test_get_logger_suppressed_message_args_are_not_formatted(self):
+        """
+        Function under test: configure_logger_globally, get_logger
+        Test that arguments of a debug message are not formatted while INFO logging level is configured
+        """
+
+        configure_logger_globally('INFO')
+        arg_mock = MagicMock()
+        get_logger('test_logger').debug('Test debug message %s', arg_mock)
+        arg_mock.__str__.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,13 +1,16 @@
+import json
 import unittest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch, mock_open, Mock
+import numpy as np
 import pandas as pd
 from datetime import date
 from collections import namedtuple
+from pathlib import Path
 from services.report_generator_service import (
     generate_report, _validate_if_report_exists, _generate_csv_report_with_historical_data,
     _generate_json_report_with_historical_data, _get_largest_exchange_rate_increase_and_decrease,
-    _find_largest_increase_and_decrease, _generate_csv_report_with_analytical_data,
-    _generate_json_report_with_analytical_data
+    _generate_csv_report_with_analytical_data, _generate_json_report_with_analytical_data, _format_dates,
+    _new_scan_states, _update_scan_states, _pop_buffered_chunks, REPORT_WRITERS
 )
 
 class TestReportGeneratorTypeAndFormat(unittest.TestCase):
@@ -23,31 +26,33 @@ class TestReportGeneratorTypeAndFormat(unittest.TestCase):
         })
 
     @patch('services.report_generator_service.get_exchange_rates_data_from_database')
-    @patch('services.report_generator_service._generate_csv_report_with_historical_data')
-    def test_generate_historical_csv_report(self, mock_generate_csv, mock_get_data):
+    @patch.dict(REPORT_WRITERS)
+    def test_generate_historical_csv_report(self, mock_get_data):
         """
         Test that given features of the report will be provided:
             - type: historical
             - format: .csv
         """
 
+        mock_generate_csv = REPORT_WRITERS[('historical', '.csv')] = Mock(return_value=1)
         mock_get_data.return_value = [self.sample_df]
         report_path = "report.csv"
 
         generate_report('h', self.start_date, self.end_date, self.currency_codes, report_path)
 
         mock_get_data.assert_called_once_with(self.start_date, self.end_date, self.currency_codes)
-        mock_generate_csv.assert_called_once()
+        mock_generate_csv.assert_called_once_with([self.sample_df], Path(report_path))
 
     @patch('services.report_generator_service.get_exchange_rates_data_from_database')
-    @patch('services.report_generator_service._generate_json_report_with_historical_data')
-    def test_generate_historical_json_report(self, mock_generate_json, mock_get_data):
+    @patch.dict(REPORT_WRITERS)
+    def test_generate_historical_json_report(self, mock_get_data):
         """
         Test that given features of the report will be provided:
             - type: historical
             - format: .json
         """
 
+        mock_generate_json = REPORT_WRITERS[('historical', '.json')] = Mock(return_value=1)
         mock_get_data.return_value = [self.sample_df]
         report_path = "report.json"
 
@@ -57,14 +62,15 @@ class TestReportGeneratorTypeAndFormat(unittest.TestCase):
         mock_generate_json.assert_called_once()
 
     @patch('services.report_generator_service.get_exchange_rates_data_from_database')
-    @patch('services.report_generator_service._generate_csv_report_with_analytical_data')
-    def test_generate_analytical_csv_report(self, mock_generate_csv, mock_get_data):
+    @patch.dict(REPORT_WRITERS)
+    def test_generate_analytical_csv_report(self, mock_get_data):
         """
         Test that given features of the report will be provided:
             - type: analytical
             - format: .csv
         """
 
+        mock_generate_csv = REPORT_WRITERS[('analytical', '.csv')] = Mock(return_value=1)
         mock_get_data.return_value = [self.sample_df]
         report_path = "report.csv"
 
@@ -74,13 +80,14 @@ class TestReportGeneratorTypeAndFormat(unittest.TestCase):
         mock_generate_csv.assert_called_once()
 
     @patch('services.report_generator_service.get_exchange_rates_data_from_database')
-    @patch('services.report_generator_service._generate_json_report_with_analytical_data')
-    def test_generate_analytical_json_report(self, mock_generate_csv, mock_get_data):
+    @patch.dict(REPORT_WRITERS)
+    def test_generate_analytical_json_report(self, mock_get_data):
         """
         Test that given features of the report will be provided:
             - type: analytical
             - format: .json
         """
+        mock_generate_csv = REPORT_WRITERS[('analytical', '.json')] = Mock(return_value=1)
         mock_get_data.return_value = [self.sample_df]
         report_path = "report.json"
 
@@ -89,21 +96,46 @@ class TestReportGeneratorTypeAndFormat(unittest.TestCase):
         mock_get_data.assert_called_once_with(self.start_date, self.end_date, self.currency_codes)
         mock_generate_csv.assert_called_once()
 
-    def test_invalid_report_type(self):
+    @patch('services.report_generator_service.get_exchange_rates_data_from_database')
+    def test_invalid_report_type(self, mock_get_data):
         """
-        Test that SystemExit exception is raised on unsupported report type.
+        Test that SystemExit exception is raised on unsupported report type before any data is requested.
         """
 
         with self.assertRaises(SystemExit):
             generate_report('invalid', self.start_date, self.end_date, self.currency_codes, "report.csv")
+        mock_get_data.assert_not_called()
 
-    def test_invalid_file_extension(self):
+    @patch('services.report_generator_service.get_exchange_rates_data_from_database')
+    def test_invalid_file_extension(self, mock_get_data):
         """
-        Test that SystemExit exception is raised on unsupported file format.
+        Test that SystemExit exception is raised on unsupported file format before any data is requested.
         """
 
         with self.assertRaises(SystemExit):
             generate_report('h', self.start_date, self.end_date, self.currency_codes, "report.txt")
+        mock_get_data.assert_not_called()
+
+    def test_validate_if_report_exists(self):
+        """
+        Function under test: _validate_if_report_exists
+        Test that the report size returned by the writer is logged without checking the file again.
+        """
+
+        with patch('os.path.exists') as exists_mock, \
+                self.assertLogs('services.report_generator_service', level='INFO') as logs:
+            _validate_if_report_exists("report.csv", 128)
+        exists_mock.assert_not_called()
+        self.assertIn('report.csv (128 bytes)', logs.output[0])
+
+    def test_validate_if_report_exists_empty_report(self):
+        """
+        Function under test: _validate_if_report_exists
+        Test that a warning is logged when nothing has been written to the report.
+        """
+
+        with self.assertLogs('services.report_generator_service', level='WARNING'):
+            _validate_if_report_exists("report.csv", 0)
 
 class TestHistoricalReportGeneration(unittest.TestCase):
     def setUp(self):
@@ -123,7 +155,37 @@ class TestHistoricalReportGeneration(unittest.TestCase):
 
         report_path = "./report.csv"
         _generate_csv_report_with_historical_data(self.df_gen, report_path)
-        mock_file.assert_called_with(report_path, 'a', encoding='utf-8', errors='strict', newline='')
+        mock_file.assert_called_once_with(report_path, mode='w', encoding='utf-8', newline='')
+
+    @patch('builtins.open')
+    def test_generate_csv_historical_report_empty_chunk(self, mock_file):
+        """
+        Test that no .csv report file is created when the data consists of an empty chunk only.
+        """
+
+        empty_df = self.sample_df.iloc[0:0]
+
+        report_size = _generate_csv_report_with_historical_data([empty_df], "report.csv")
+        mock_file.assert_not_called()
+        self.assertEqual(0, report_size)
+
+    @patch('builtins.open', new_callable=mock_open)
+    def test_generate_csv_historical_report_content(self, mock_file):
+        """
+        Test that historical .csv report contains a header per currency followed by its rates.
+        """
+
+        second_chunk = pd.DataFrame({
+            'date': [date(2024, 1, 3), date(2024, 1, 1)],
+            'currency_code': ['EUR', 'USD'],
+            'currency_name': ['euro', 'dolar amerykański'],
+            'currency_rate': [1.2, 4.05]
+        })
+
+        _generate_csv_report_with_historical_data([self.sample_df, second_chunk], "report.csv")
+        report = ''.join(call.args[0] for call in mock_file().write.call_args_list)
+        self.assertEqual('EUR\nDate,Exchange rate\n2024-01-01,1.0\n2024-01-02,1.1\n2024-01-03,1.2\n'
+                         '\n\nUSD\nDate,Exchange rate\n2024-01-01,4.05\n', report)
 
     @patch('builtins.open')
     def test_generate_json_historical_report(self, mock_file):
@@ -133,14 +195,44 @@ class TestHistoricalReportGeneration(unittest.TestCase):
 
         report_path = "report.json"
         _generate_json_report_with_historical_data(self.df_gen, report_path)
-        mock_file.assert_called_with(report_path, mode='w', encoding='utf-8')
+        mock_file.assert_called_with(report_path, mode='wb')
+
+    @patch('builtins.open', new_callable=mock_open)
+    def test_generate_json_historical_report_currency_split_between_chunks(self, mock_file):
+        """
+        Test that rates of a currency divided into separate chunks are merged into a single record.
+        """
+
+        second_chunk = pd.DataFrame({
+            'date': [date(2024, 1, 3)],
+            'currency_code': ['EUR'],
+            'currency_name': ['euro'],
+            'currency_rate': [1.2]
+        })
+
+        _generate_json_report_with_historical_data([self.sample_df, second_chunk], "report.json")
+        report = json.loads(b''.join(call.args[0] for call in mock_file().write.call_args_list))
+        self.assertEqual(1, len(report))
+        self.assertEqual('EUR', report[0]['currency_code'])
+        self.assertEqual([{'date': '2024-01-01', 'rate': 1.0},
+                          {'date': '2024-01-02', 'rate': 1.1},
+                          {'date': '2024-01-03', 'rate': 1.2}], report[0]['rates'])
+
+    def test_format_dates(self):
+        """
+        Function under test: _format_dates
+        Test that repeated dates are converted to strings aligned with the input.
+        """
+
+        dates = pd.Series([date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 1)])
+        self.assertEqual(['2024-01-01', '2024-01-02', '2024-01-01'], _format_dates(dates).tolist())
 
 class TestAnalyticalReportGeneration(unittest.TestCase):
     def setUp(self):
-        self.curr_map = namedtuple('currency_map', ['curr_info', 'value'])
+        self.curr_map = namedtuple('currency_map', ['curr_code', 'value'])
         self.test_data = {
-            'max_recorded_increase': self.curr_map(('EUR', 'euro'), 0.2),
-            'max_recorded_decrease': self.curr_map(('USD', 'dolar amerykański'), 0.3)
+            'max_recorded_increase': self.curr_map('EUR', 0.2),
+            'max_recorded_decrease': self.curr_map('USD', 0.3)
         }
 
     @patch('builtins.open', new_callable=mock_open)
@@ -161,7 +253,10 @@ class TestAnalyticalReportGeneration(unittest.TestCase):
 
         report_path = "report.json"
         _generate_json_report_with_analytical_data(self.test_data, report_path)
-        mock_file.assert_called_with(report_path, mode='w', encoding='utf-8')
+        mock_file.assert_called_with(report_path, mode='wb')
+        report = json.loads(mock_file().write.call_args.args[0])
+        self.assertEqual([{'max_recorded_increase': 0.2, 'currency_code': 'EUR'},
+                          {'max_recorded_decrease': 0.3, 'currency_code': 'USD'}], report)
 
 class TestGenerateAnalyticalData(unittest.TestCase):
 
@@ -184,60 +279,219 @@ class TestGenerateAnalyticalData(unittest.TestCase):
         result = _get_largest_exchange_rate_increase_and_decrease(df_gen)
         self.assertIn('max_recorded_increase', result)
         self.assertIn('max_recorded_decrease', result)
-        self.assertTrue(result['max_recorded_increase'].curr_info)
+        self.assertEqual('EUR', result['max_recorded_increase'].curr_code)
         self.assertTrue(result['max_recorded_increase'].value)
-        self.assertTrue(result['max_recorded_decrease'].curr_info)
+        self.assertEqual('USD', result['max_recorded_decrease'].curr_code)
         self.assertTrue(result['max_recorded_decrease'].value)
 
-    def test_find_largest_increase_and_decrease_only_increasing_values(self):
+    def test_get_largest_exchange_rate_changes_currency_split_between_chunks(self):
+        """
+        Test that the scan of a currency divided into separate chunks is continued in the next chunk.
         """
+
+        first_chunk = pd.DataFrame({
+            'date': [date(2024, 1, 1), date(2024, 1, 2)],
+            'currency_code': ['EUR', 'EUR'],
+            'currency_rate': [1.0, 1.1]
+        })
+        second_chunk = pd.DataFrame({
+            'date': [date(2024, 1, 3), date(2024, 1, 1), date(2024, 1, 2)],
+            'currency_code': ['EUR', 'USD', 'USD'],
+            'currency_rate': [1.5, 2.1, 1.8]
+        })
+
+        result = _get_largest_exchange_rate_increase_and_decrease([first_chunk, second_chunk])
+        self.assertEqual(0.5, round(result['max_recorded_increase'].value, 1))
+        self.assertEqual(0.3, round(result['max_recorded_decrease'].value, 1))
+
+    @patch('services.report_generator_service.MAX_IN_MEMORY_ROWS', 2)
+    def test_get_largest_exchange_rate_changes_above_in_memory_limit(self):
+        """
+        Test that chunks exceeding MAX_IN_MEMORY_ROWS are processed one by one with the same result.
+        """
+
+        first_chunk = pd.DataFrame({
+            'date': [date(2024, 1, 1), date(2024, 1, 2)],
+            'currency_code': ['EUR', 'EUR'],
+            'currency_rate': [1.0, 1.1]
+        })
+        second_chunk = pd.DataFrame({
+            'date': [date(2024, 1, 3), date(2024, 1, 1), date(2024, 1, 2)],
+            'currency_code': ['EUR', 'USD', 'USD'],
+            'currency_rate': [1.5, 2.1, 1.8]
+        })
+
+        with patch('services.report_generator_service.pd.concat') as concat_mock:
+            result = _get_largest_exchange_rate_increase_and_decrease(iter([first_chunk, second_chunk]))
+        concat_mock.assert_not_called()
+        self.assertEqual('EUR', result['max_recorded_increase'].curr_code)
+        self.assertEqual(0.5, round(result['max_recorded_increase'].value, 1))
+        self.assertEqual('USD', result['max_recorded_decrease'].curr_code)
+        self.assertEqual(0.3, round(result['max_recorded_decrease'].value, 1))
+
+    def test_pop_buffered_chunks(self):
+        """
+        Function under test: _pop_buffered_chunks
+        Test that chunks are yielded in their order and removed from the buffer once consumed.
+        """
+
+        buffered_chunks = ['first', 'second', 'third']
+        chunks_iter = _pop_buffered_chunks(buffered_chunks)
+
+        self.assertEqual('first', next(chunks_iter))
+        self.assertEqual(['third', 'second'], buffered_chunks)
+        self.assertEqual(['second', 'third'], list(chunks_iter))
+        self.assertEqual([], buffered_chunks)
+
+    def test_get_largest_exchange_rate_changes_unlisted_currency(self):
+        """
+        Test that currencies missing from AVAILABLE_CURRENCIES are taken into account.
+        """
+
+        sample_df = pd.DataFrame({
+            'date': [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 1), date(2024, 1, 2)],
+            'currency_code': ['EUR', 'EUR', 'XAU', 'XAU'],
+            'currency_rate': [1.0, 1.2, 2.0, 2.5]
+        })
+
+        result = _get_largest_exchange_rate_increase_and_decrease([sample_df])
+        self.assertEqual('XAU', result['max_recorded_increase'].curr_code)
+        self.assertEqual(0.5, round(result['max_recorded_increase'].value, 1))
+        self.assertEqual('EUR', result['max_recorded_decrease'].curr_code)
+        self.assertEqual(0, result['max_recorded_decrease'].value)
+
+    def test_get_largest_exchange_rate_changes_tie_reports_first_currency_code(self):
+        """
+        Test that the alphabetically first currency code is reported when currencies share the largest change.
+        """
+
+        sample_df = pd.DataFrame({
+            'date': [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 1), date(2024, 1, 2)],
+            'currency_code': ['USD', 'USD', 'EUR', 'EUR'],
+            'currency_rate': [1.5, 2.0, 4.5, 5.0]
+        })
+
+        result = _get_largest_exchange_rate_increase_and_decrease([sample_df])
+        self.assertEqual('EUR', result['max_recorded_increase'].curr_code)
+        self.assertEqual(0.5, result['max_recorded_increase'].value)
+        self.assertEqual('EUR', result['max_recorded_decrease'].curr_code)
+        self.assertEqual(0, result['max_recorded_decrease'].value)
+
+    def test_get_largest_exchange_rate_changes_no_data(self):
+        """
+        Test that no currency is reported when there are no records.
+        """
+
+        result = _get_largest_exchange_rate_increase_and_decrease([])
+        self.assertIsNone(result['max_recorded_increase'].curr_code)
+        self.assertIsNone(result['max_recorded_decrease'].curr_code)
+
+    def test_update_scan_states_continues_carried_state(self):
+        """
+        Function under test: _update_scan_states
+        Test that interleaved rates of several currencies are scanned separately, starting from the carried state.
+        """
+
+        scan_states = _new_scan_states(3)
+        _update_scan_states(scan_states, np.array([0, 2, 0]), np.array([1.0, 3.0, 1.5]))
+        _update_scan_states(scan_states, np.array([2, 0, 2]), np.array([2.0, 0.5, 2.5]))
+
+        np.testing.assert_allclose([0.5, 0.5, 1.5, 1.0], scan_states[0])
+        np.testing.assert_allclose([2.0, 0.5, 3.0, 1.0], scan_states[2])
+        self.assertEqual(float('-inf'), scan_states[1, 1])
+
+    @staticmethod
+    def _scan_single_currency(rates: list) -> (float, float):
+        """
+        Scan rates of a single currency with _update_scan_states and return (max_increase, max_decrease).
+        """
+
+        scan_states = _new_scan_states(1)
+        _update_scan_states(scan_states, np.zeros(len(rates), dtype=np.intp), np.array(rates, dtype=np.float64))
+        return scan_states[0, 1], scan_states[0, 3]
+
+    def test_update_scan_states_only_increasing_values(self):
+        """
+        Function under test: _update_scan_states
         Test finding the largest rate increases and decreases when values are constantly increasing.
         """
 
-        max_increase, max_decrease = _find_largest_increase_and_decrease([1.0, 1.2, 1.4, 1.6, 1.8])
+        max_increase, max_decrease = self._scan_single_currency([1.0, 1.2, 1.4, 1.6, 1.8])
 
         self.assertEqual(0.8, round(max_increase, 1))
         self.assertEqual(0, round(max_decrease, 1))
 
-    def test_find_largest_increase_and_decrease_only_decreasing_values(self):
+    def test_update_scan_states_only_decreasing_values(self):
         """
+        Function under test: _update_scan_states
         Test finding the largest rate increases and decreases when values are constantly decreasing.
         """
 
-        max_increase, max_decrease = _find_largest_increase_and_decrease([1.8, 1.6, 1.4, 1.2, 1.0])
+        max_increase, max_decrease = self._scan_single_currency([1.8, 1.6, 1.4, 1.2, 1.0])
 
         self.assertEqual(0, round(max_increase, 1))
         self.assertEqual(0.8, round(max_decrease, 1))
 
-    def test_find_largest_increase_and_decrease_constant_values(self):
+    def test_update_scan_states_constant_values(self):
         """
+        Function under test: _update_scan_states
         Test finding the largest rate increases and decreases when values are constantly the same.
         """
 
-        max_increase, max_decrease = _find_largest_increase_and_decrease([1.0, 1.0, 1.0, 1.0])
+        max_increase, max_decrease = self._scan_single_currency([1.0, 1.0, 1.0, 1.0])
 
         self.assertEqual(0, round(max_increase, 1))
         self.assertEqual(0, round(max_decrease, 1))
 
-    def test_find_largest_increase_and_decrease_single_value(self):
+    def test_update_scan_states_single_value(self):
         """
+        Function under test: _update_scan_states
         Test finding the largest rate increases and decreases when there is single value only.
         """
 
-        max_increase, max_decrease = _find_largest_increase_and_decrease([1.0])
+        max_increase, max_decrease = self._scan_single_currency([1.0])
 
         self.assertEqual(0, round(max_increase, 1))
         self.assertEqual(0, round(max_decrease, 1))
 
-    def test_find_largest_increase_and_decrease_negative_values(self):
+    def test_update_scan_states_negative_values(self):
         """
+        Function under test: _update_scan_states
         Test finding the largest rate increases and decreases when there are negative values also.
         """
 
-        max_increase, max_decrease = _find_largest_increase_and_decrease([-1.0, -2.0, 1.0, -3.0, 2.0])
+        max_increase, max_decrease = self._scan_single_currency([-1.0, -2.0, 1.0, -3.0, 2.0])
 
         self.assertEqual(5.0, round(max_increase, 1))
         self.assertEqual(4.0, round(max_decrease, 1))
 
+    def test_update_scan_states_large_series(self):
+        """
+        Function under test: _update_scan_states
+        Test finding the largest rate increases and decreases in a series of a million values.
+        """
+
+        rates = np.concatenate((np.linspace(1.0, 2.0, 500_000), np.linspace(2.0, 0.5, 500_000)))
+
+        max_increase, max_decrease = self._scan_single_currency(rates)
+
+        self.assertEqual(1.0, round(max_increase, 6))
+        self.assertEqual(1.5, round(max_decrease, 6))
+
+    def test_get_largest_exchange_rate_changes_empty_chunk(self):
+        """
+        Test that no currency is reported when the data consists of an empty chunk only.
+        """
+
+        empty_df = pd.DataFrame({
+            'date': pd.Series([], dtype='object'),
+            'currency_code': pd.Series([], dtype='category'),
+            'currency_rate': pd.Series([], dtype='float64')
+        })
+
+        result = _get_largest_exchange_rate_increase_and_decrease([empty_df])
+        self.assertIsNone(result['max_recorded_increase'].curr_code)
+        self.assertIsNone(result['max_recorded_decrease'].curr_code)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file